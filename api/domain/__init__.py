@@ -364,6 +364,23 @@ def format_sql_params(base_sql, params):
     return sql, values
 
 
+def format_update_params(table, updates, params, returning='id'):
+    """
+    Build an UPDATE statement for the rows matching params, returning
+    a column from each of the updated rows
 
+    :param table: table to update
+    :param updates: dictionary of column: new value
+    :param params: dictionary of column: value, as for format_sql_params
+    :param returning: column to return from the updated rows
+    :return: sql string, tuple of values
+    """
+    if not updates or not params:
+        raise ValueError('update requires both updates and conditions')
 
-
+    fields, new_values = zip(*updates.items())
+    base_sql = 'UPDATE {} SET {} WHERE '.format(
+        table, ', '.join('{} = %s'.format(f) for f in fields))
+    sql, values = format_sql_params(base_sql, params)
+    return (sql + ' RETURNING {}'.format(returning),
+            tuple(new_values) + tuple(values))
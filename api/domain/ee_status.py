@@ -0,0 +1,126 @@
+""" Outbox of unit status changes waiting to be delivered to EarthExplorer """
+from psycopg2.extras import Json
+
+from api.domain.query import Query
+from api.util.dbconnect import DBConnectException, db_instance
+from api.system.logger import ilogger as logger
+
+
+class EEStatusUpdateException(Exception):
+    pass
+
+
+class EEStatusUpdate(object):
+    """
+    Unit status changes (C complete, R rejected) are recorded here alongside
+    the scene, and sent to LTA later in batches, so callers never wait on
+    the LTA SOAP service
+
+    Only one undelivered update is kept per EE order unit, a newer status
+    replaces one not yet sent
+    """
+    table = 'ordering_ee_status_update'
+
+    # seconds a claimed update is hidden from other delivery runs
+    lease = 600
+
+    # longest wait between delivery attempts of a failing update
+    max_backoff = '6 hours'
+
+    @classmethod
+    def _execute(cls, sql, values, name):
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, values)
+                logger.info('ee_status.py {} sql: {}'.format(name, log_sql))
+                db.execute(sql, values)
+                db.commit()
+                ret = [dict(i) for i in db]
+        except DBConnectException as e:
+            logger.critical('Error {} EE status updates: {}\n'
+                            'sql: {}'.format(name, e.message, log_sql))
+            raise EEStatusUpdateException(e)
+        return ret
+
+    @classmethod
+    def enqueue(cls, updates):
+        """
+        Record status changes to be delivered
+
+        :param updates: list of (scene id, ee order id, ee unit id, status)
+        :return: True
+        """
+        # one row per unit, the statement may not touch a unit twice
+        rows = dict()
+        for scene_id, ee_order_id, ee_unit_id, status in updates:
+            rows[(str(ee_order_id), int(ee_unit_id))] = {
+                'scene_id': scene_id, 'ee_order_id': str(ee_order_id),
+                'ee_unit_id': int(ee_unit_id), 'status': status}
+        if not rows:
+            return True
+
+        sql = ('INSERT INTO {0} (scene_id, ee_order_id, ee_unit_id, status) '
+               'SELECT scene_id, ee_order_id, ee_unit_id, status '
+               'FROM json_populate_recordset(NULL::{0}, %s) '
+               'ON CONFLICT (ee_order_id, ee_unit_id) WHERE delivered IS NULL '
+               'DO UPDATE SET status = EXCLUDED.status, scene_id = EXCLUDED.scene_id, '
+               'attempts = 0, next_attempt = now(), last_error = NULL '
+               'RETURNING id'.format(cls.table))
+        cls._execute(sql, (Json(rows.values()),), 'enqueue')
+        return True
+
+    @classmethod
+    def claim(cls, limit=1000):
+        """
+        Take the undelivered updates which are due, hiding them from other
+        delivery runs for the lease period
+
+        :param limit: most updates to claim
+        :return: list of dicts, in the order they were queued
+        """
+        sql = ('UPDATE {0} SET next_attempt = now() + %s * interval \'1 second\' '
+               'WHERE id IN (SELECT id FROM {0} '
+               'WHERE delivered IS NULL AND next_attempt <= now() '
+               'ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED) '
+               'RETURNING id, scene_id, ee_order_id, ee_unit_id, status, attempts'
+               .format(cls.table))
+        rows = cls._execute(sql, (cls.lease, int(limit)), 'claim')
+        return sorted(rows, key=lambda r: r['id'])
+
+    @classmethod
+    def mark_delivered(cls, ids):
+        """
+        :param ids: list of update ids accepted by LTA
+        :return: True
+        """
+        if ids:
+            sql = ('UPDATE {} SET delivered = now(), last_error = NULL '
+                   'WHERE id IN %s RETURNING id'.format(cls.table))
+            cls._execute(sql, (tuple(ids),), 'delivered')
+        return True
+
+    @classmethod
+    def mark_failed(cls, ids, error):
+        """
+        Schedule another attempt, backing off exponentially per failure
+
+        :param ids: list of update ids which could not be delivered
+        :param error: message to record
+        :return: True
+        """
+        if ids:
+            sql = ('UPDATE {} SET attempts = attempts + 1, last_error = %s, '
+                   'next_attempt = now() + LEAST(power(2, attempts) * interval \'1 minute\', '
+                   'interval %s) WHERE id IN %s RETURNING id'.format(cls.table))
+            cls._execute(sql, (str(error), cls.max_backoff, tuple(ids)), 'failed')
+        return True
+
+    @classmethod
+    def where(cls, params):
+        """
+        :param params: dictionary of column: value parameters
+        :return: list of dicts
+        """
+        return Query(cls.table, params, exception=EEStatusUpdateException)\
+            .order_by('id').all()
@@ -0,0 +1,68 @@
+""" Display ID to M2M entity ID mappings, kept behind memcache """
+from psycopg2.extras import Json
+
+from api.util.dbconnect import DBConnectException, db_instance
+from api.system.logger import ilogger as logger
+
+
+class M2MEntityException(Exception):
+    pass
+
+
+class M2MEntity(object):
+    """
+    Entity IDs resolved by the M2M idLookup, which never change once
+    assigned. A NULL entity_id records a display ID M2M did not know about
+    """
+    table = 'ordering_m2m_entity'
+
+    @classmethod
+    def _execute(cls, sql, values, name):
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, values)
+                logger.debug('m2m_entity.py {} sql: {}'.format(name, log_sql))
+                db.execute(sql, values)
+                db.commit()
+                ret = [dict(i) for i in db]
+        except DBConnectException as e:
+            logger.critical('Error {} M2M entity IDs: {}\n'
+                            'sql: {}'.format(name, e.message, log_sql))
+            raise M2MEntityException(e)
+        return ret
+
+    @classmethod
+    def lookup(cls, display_ids, found_ttl, missing_ttl):
+        """
+        :param display_ids: list of display IDs
+        :param found_ttl: seconds a resolved entity ID is trusted
+        :param missing_ttl: seconds a display ID is known to be missing
+        :return: dict {display id: entity id, or None if known missing}
+        """
+        if not display_ids:
+            return dict()
+        sql = ('SELECT display_id, entity_id FROM {} WHERE display_id IN %s '
+               'AND updated > now() - CASE WHEN entity_id IS NULL '
+               'THEN %s ELSE %s END * interval \'1 second\''.format(cls.table))
+        rows = cls._execute(sql, (tuple(display_ids), missing_ttl, found_ttl),
+                            'lookup')
+        return {r['display_id']: r['entity_id'] for r in rows}
+
+    @classmethod
+    def save(cls, entity_ids):
+        """
+        :param entity_ids: dict {display id: entity id, or None if missing}
+        :return: True
+        """
+        if not entity_ids:
+            return True
+        rows = [{'display_id': k, 'entity_id': v} for k, v in entity_ids.items()]
+        sql = ('INSERT INTO {0} (display_id, entity_id) '
+               'SELECT display_id, entity_id '
+               'FROM json_populate_recordset(NULL::{0}, %s) '
+               'ON CONFLICT (display_id) DO UPDATE '
+               'SET entity_id = EXCLUDED.entity_id, updated = now() '
+               'RETURNING display_id'.format(cls.table))
+        cls._execute(sql, (Json(rows),), 'save')
+        return True
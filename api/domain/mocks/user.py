@@ -1,6 +1,7 @@
 import os
 from api.domain.user import User
 from api.util.dbconnect import db_instance
+from api.providers.caching.caching_provider import CachingProvider, local_cache
 
 
 class MockUserException(Exception):
@@ -31,6 +32,9 @@ class MockUser(object):
         with db_instance() as db:
             db.execute(sql)
             db.commit()
+        # cached logins carry the deleted user ids
+        CachingProvider().cache.delete('bilbo_baggins-credentials')
+        local_cache.clear()
 
     @classmethod
     def get(cls, *args):
@@ -6,7 +6,8 @@ import copy
 from api.util.dbconnect import DBConnectException, db_instance
 import psycopg2.extensions as db_extns
 from api.domain.scene import Scene, SceneException
-from api.domain import sensor, format_sql_params
+from api.domain import sensor, format_sql_params, format_update_params
+from api.domain.query import Query
 from api.system.logger import ilogger as logger
 from psycopg2.extras import Json
 
@@ -25,6 +26,16 @@ class Order(object):
     valid_statuses = ('complete', 'queued', 'oncache', 'onorder', 'purged',
                       'processing', 'error', 'unavailable', 'submitted')
 
+    # columns written by save
+    save_cols = ('orderid', 'status', 'order_source',
+                 'product_options', 'product_opts', 'order_type',
+                 'initial_email_sent', 'completion_email_sent',
+                 'note', 'completion_date', 'order_date', 'user_id',
+                 'ee_order_id', 'email', 'priority')
+
+    __slots__ = (('id', '_saved', '_product_opts') +
+                 tuple(c for c in save_cols if c != 'product_opts'))
+
     def __init__(self, id=None, orderid=None, status=None, order_source=None,
                  order_type=None, product_options=None,
                  product_opts=None, initial_email_sent=None,
@@ -69,21 +80,35 @@ class Order(object):
         self.email = email
         self.priority = priority
 
-        if id:
-            # no need to query the DB again
-            self.id = id
-        else:
-            with db_instance() as db:
-                sql = 'select id from ordering_order where orderid = %s'
-                db.select(sql, orderid)
-                if db:
-                    self.id = db[0]['id']
-                else:
-                    self.id = None
+        # construction never queries, see lookup_id for finding an id
+        self.id = id
+
+        self._mark_clean()
 
     def __repr__(self):
         return 'Order: {}'.format(self.as_dict())
 
+    def __getstate__(self):
+        # slotted, so pickling (memcache) needs the state spelled out
+        return {k: getattr(self, k) for k in self.__slots__ if hasattr(self, k)}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    @property
+    def product_opts(self):
+        # modified in place by callers, so the saved value is copied
+        # before it is first handed out, rather than for every order built
+        if self._product_opts is not None \
+                and self._saved.get('product_opts') is self._product_opts:
+            self._saved['product_opts'] = copy.deepcopy(self._product_opts)
+        return self._product_opts
+
+    @product_opts.setter
+    def product_opts(self, value):
+        self._product_opts = value
+
     def as_dict(self):
         return {
                   "completion_date": self.completion_date,
@@ -222,11 +247,7 @@ class Order(object):
                 logger.info('order.py where sql: {}'.format(log_sql))
 
                 db.select(sql, values)
-
-                for i in db:
-                    od = dict(i)
-                    obj = Order(**od)
-                    ret.append(obj)
+                ret = cls._from_rows(db)
         except DBConnectException as e:
             logger.critical('Error order where: {}\n'
                             'sql: {}'.format(e.message, log_sql))
@@ -234,6 +255,68 @@ class Order(object):
 
         return ret
 
+    @classmethod
+    def lookup_id(cls, orderid):
+        """
+        Retrieve the id of an order from its long name
+
+        :param orderid: order ID long name, someone@someplace-123456
+        :return: order id, or None if not found
+        """
+        with db_instance() as db:
+            db.select('select id from ordering_order where orderid = %s',
+                      orderid)
+
+        return db[0]['id'] if db else None
+
+    @staticmethod
+    def _from_rows(rows):
+        return [Order(**dict(i)) for i in rows]
+
+    @classmethod
+    def query(cls, params=None):
+        """
+        Build a query against the ordering_order table, supporting
+        ordering, limits, projection and counts
+
+        :param params: dictionary of column: value parameter to select on
+        :return: Query, whose all() returns Order objects
+        """
+        return Query('ordering_order', params, build=cls._from_rows,
+                     exception=OrderException)
+
+    @classmethod
+    def update_where(cls, params, updates, returning='id'):
+        """
+        Update the rows matching params, without retrieving them first
+
+        :param params: dictionary of column: value parameter to select on
+        :param updates: dictionary of column: new value
+        :param returning: column to return for each updated order
+        :return: list of the returning column values, one per updated order
+        """
+        if not isinstance(params, dict) or not isinstance(updates, dict):
+            raise OrderException('update_where arguments must be '
+                                 'passed as dictionaries')
+
+        sql, values = format_update_params('ordering_order', updates, params,
+                                           returning)
+
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, values)
+                logger.info('order.py update_where sql: {}'.format(log_sql))
+                db.execute(sql, values)
+                db.commit()
+                ret = [i[returning] for i in db]
+        except DBConnectException as e:
+            logger.critical('Error updating orders: {}\n'
+                            'sql: {}'.format(e.message, log_sql))
+            raise OrderException(e)
+
+        return ret
+
     @classmethod
     def find(cls, id):
         """
@@ -475,53 +558,84 @@ class Order(object):
 
         return ret
 
-    def save(self):
+    def _mark_clean(self):
         """
-        Upsert self to the database
+        Remember the saved column values, for use by changed_fields
+        """
+        self._saved = dict((c, getattr(self, c)) for c in self.save_cols
+                           if c != 'product_opts')
+        # copied on first access, see product_opts
+        self._saved['product_opts'] = self._product_opts
+
+    def changed_fields(self):
+        """
+        Columns whose values differ from when the order was last
+        retrieved or saved
+
+        :return: tuple of column names
+        """
+        return tuple(c for c in self.save_cols
+                     if getattr(self, c) != self._saved.get(c))
+
+    def save(self, changed_only=False):
         """
-        sql = ('INSERT INTO ordering_order %s VALUES %s '
-               'ON CONFLICT (orderid) '
-               'DO UPDATE '
-               'SET %s = %s')
+        Upsert self to the database
 
-        attr_tup = ('orderid', 'status', 'order_source',
-                    'product_options', 'product_opts', 'order_type',
-                    'initial_email_sent', 'completion_email_sent',
-                    'note', 'completion_date', 'order_date', 'user_id',
-                    'ee_order_id', 'email', 'priority')
+        :param changed_only: only write the columns modified since the
+         order was retrieved or last saved, requires an existing order
+        """
+        if changed_only and self.id:
+            attr_tup = self.changed_fields()
+            if not attr_tup:
+                return
+            sql = ('UPDATE ordering_order SET {} WHERE id = %s '
+                   'RETURNING *'
+                   .format(', '.join('{} = %s'.format(c) for c in attr_tup)))
+        else:
+            attr_tup = self.save_cols
+            sql = ('INSERT INTO ordering_order ({0}) VALUES %s '
+                   'ON CONFLICT (orderid) '
+                   'DO UPDATE '
+                   'SET ({0}) = %s '
+                   'RETURNING *'.format(','.join(attr_tup)))
 
         vals = tuple(self.__getattribute__(v)
                      if v != 'product_opts'
                      else json.dumps(self.__getattribute__(v))
                      for v in attr_tup)
 
-        cols = '({})'.format(','.join(attr_tup))
+        if changed_only and self.id:
+            args = vals + (self.id,)
+        else:
+            args = (vals, vals)
 
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(cols),
-                                                  vals,
-                                                  db_extns.AsIs(cols),
-                                                  vals))
-                db.execute(sql, (db_extns.AsIs(cols), vals,
-                                 db_extns.AsIs(cols), vals))
+                log_sql = db.cursor.mogrify(sql, args)
+                db.execute(sql, args)
                 db.commit()
 
                 logger.info('Saved updates to order id: {}\n'
                             'order.id: {}\nsql: {}\nargs: {}'
                             .format(self.orderid, self.id, log_sql,
                                     zip(attr_tup, vals)))
+                new = dict(db[0])
         except DBConnectException as e:
             logger.critical('Error saving order: {}\nsql: {}'
                             .format(e.message, log_sql))
 
             raise OrderException(e)
+        except IndexError:
+            logger.critical('Error saving order, no row returned\n'
+                            'sql: {}'.format(log_sql))
+            raise OrderException('No order saved for {}'
+                                 .format(self.orderid))
 
-        new = Order.find(self.id)
+        for att, val in new.items():
+            self.__setattr__(att, val)
 
-        for att in attr_tup:
-            self.__setattr__(att, new.__getattribute__(att))
+        self._mark_clean()
 
     def update(self, att, val):
         """
@@ -549,12 +663,13 @@ class Order(object):
 
         return self.__getattribute__(att)
 
-    def scenes(self, sql_dict=None):
+    def scenes(self, sql_dict=None, eager=False):
         """
         Retrieve a list of Scene objects related to this
         initialized Order object
 
         :param sql_dict: dictionary object for sql parameters
+        :param eager: also select the deferred scene columns
         :return: list of Scene objects
         """
         if sql_dict:
@@ -562,20 +677,15 @@ class Order(object):
         else:
             sql_dict = {'order_id': self.id}
 
-        return Scene.where(sql_dict)
+        return Scene.where(sql_dict, eager=eager)
 
     def scene_status_count(self, status=None):
-        sql = "select count(id) from ordering_scene where order_id = %s"
-        arg_tup = (self.id,)
+        params = {'order_id': self.id}
 
         if status in self.valid_statuses:
-            sql += " AND status = %s "
-            arg_tup = (self.id, status)
-
-        with db_instance() as db:
-            db.select(sql+";", arg_tup)
+            params['status'] = status
 
-        return int(db[0][0])
+        return Scene.query(params).count()
 
     def products_by_sensor(self):
         """
@@ -0,0 +1,197 @@
+""" Composable SELECT statements shared by the domain objects """
+import copy
+
+from api.domain import format_sql_params
+from api.util.dbconnect import DBConnectException, db_instance
+from api.system.logger import ilogger as logger
+
+
+class Query(object):
+    """
+    Build and run a SELECT against a single table
+
+    Filtering uses the same dictionary syntax as format_sql_params, while
+    projection, ordering, limit/offset, counting and existence checks are
+    all pushed into the SQL instead of being done on fetched rows
+
+    Each modifier returns a new Query, so a base query can be shared:
+
+        submitted = Scene.query({'status': 'submitted'})
+        submitted.order_by('id').limit(500).all()
+        submitted.count()
+    """
+
+    def __init__(self, table, params=None, build=None, columns=('*',),
+                 exception=Exception, source=None):
+        """
+        :param table: table to select from
+        :param params: dictionary of column: value parameters to filter on
+        :param build: callable turning a list of rows into domain objects
+        :param columns: columns selected by all()
+        :param exception: exception type raised on database errors
+        :param source: FROM clause used in place of the table, such as a
+         joined subquery aliased as the table
+        """
+        self.table = table
+        self.source = source or table
+        self.params = dict(params or {})
+        self.build = build
+        self.columns = tuple(columns)
+        self.exception = exception
+        self._order_by = ()
+        self._limit = None
+        self._offset = None
+
+    def __repr__(self):
+        return 'Query: {}'.format(self.sql()[0])
+
+    def _clone(self, **attrs):
+        new = copy.copy(self)
+        new.params = dict(self.params)
+        for att, val in attrs.items():
+            setattr(new, att, val)
+        return new
+
+    def where(self, params):
+        """
+        Add further column: value filters
+
+        :param params: dictionary of column: value parameters
+        :return: Query
+        """
+        new = self._clone()
+        new.params.update(params)
+        return new
+
+    def order_by(self, *columns):
+        """
+        :param columns: column names, optionally followed by ASC/DESC
+        :return: Query
+        """
+        return self._clone(_order_by=columns)
+
+    def limit(self, count):
+        return self._clone(_limit=int(count))
+
+    def offset(self, count):
+        return self._clone(_offset=int(count))
+
+    def sql(self, columns=None):
+        """
+        Assemble the statement
+
+        :param columns: columns to select, defaults to the query columns
+        :return: sql string, tuple of values
+        """
+        base_sql = 'SELECT {} FROM {}'.format(', '.join(columns or self.columns),
+                                              self.source)
+        if self.params:
+            sql, values = format_sql_params(base_sql + ' WHERE ',
+                                            dict(self.params))
+            values = tuple(values)
+        else:
+            sql, values = base_sql, tuple()
+
+        if self._order_by:
+            sql += ' ORDER BY {}'.format(', '.join(self._order_by))
+        if self._limit is not None:
+            sql += ' LIMIT %s'
+            values += (self._limit,)
+        if self._offset is not None:
+            sql += ' OFFSET %s'
+            values += (self._offset,)
+
+        return sql, values
+
+    def _fetch(self, sql, values, row_type=None):
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, values)
+                logger.info('{} query sql: {}'.format(self.table, log_sql))
+                db.select(sql, values, row_type=row_type)
+        except DBConnectException as e:
+            logger.critical('Error querying {}: {}\n'
+                            'sql: {}'.format(self.table, e.message, log_sql))
+            raise self.exception(e)
+        return db.fetcharr
+
+    def all(self):
+        """
+        :return: list of domain objects, or row dicts if no build callable
+        """
+        rows = self._fetch(*self.sql())
+        if self.build:
+            return self.build(rows)
+        return [dict(r) for r in rows]
+
+    def first(self):
+        """
+        :return: first matching domain object, or None
+        """
+        found = self.limit(1).all()
+        return found[0] if found else None
+
+    def iterate(self, batch_size=1000, key='id'):
+        """
+        Yield the matching domain objects using keyset pagination on key,
+        holding at most batch_size rows in memory at a time
+
+        Any ordering, limit or offset on the query is replaced, the rows
+        are returned in key order
+
+        :param batch_size: rows to retrieve per query
+        :param key: unique, ordered column to page on, must be selected
+        :return: generator of domain objects, or row dicts
+        """
+        query = self._clone(_order_by=(key,), _limit=int(batch_size),
+                            _offset=None)
+        page = query
+        while True:
+            rows = self._fetch(*page.sql())
+            if not rows:
+                return
+
+            last = rows[-1][key]
+            for obj in (self.build(rows) if self.build
+                        else [dict(r) for r in rows]):
+                yield obj
+
+            if len(rows) < batch_size:
+                return
+            page = query.where({'{} >'.format(key): last})
+
+    def values(self, *columns):
+        """
+        Select only the given columns
+
+        :param columns: column names
+        :return: list of dicts
+        """
+        return [dict(r) for r in self._fetch(*self.sql(columns))]
+
+    def values_list(self, column):
+        """
+        Select a single column
+
+        :param column: column name
+        :return: list of values
+        """
+        sql, values = self.sql((column,))
+        return [r[0] for r in self._fetch(sql, values, row_type='tuple')]
+
+    def count(self):
+        """
+        :return: number of matching rows
+        """
+        sql, values = self._clone(_order_by=()).sql(('1',))
+        sql = 'SELECT count(*) AS count FROM ({}) AS q'.format(sql)
+        return int(self._fetch(sql, values, row_type='tuple')[0][0])
+
+    def exists(self):
+        """
+        :return: True if any row matches
+        """
+        sql, values = self._clone(_order_by=(), _limit=1).sql(('1',))
+        sql = 'SELECT EXISTS ({}) AS exists'.format(sql)
+        return bool(self._fetch(sql, values, row_type='tuple')[0][0])
@@ -3,29 +3,102 @@
 from api.util.dbconnect import DBConnectException, db_instance
 import psycopg2.extensions as db_extns
 from api.system.logger import ilogger as logger
-from api.domain import format_sql_params
+from api.domain import format_sql_params, format_update_params
+from api.domain.query import Query
+from psycopg2.extras import Json
 import datetime
+import functools
+import json
 
 
 class SceneException(Exception):
     pass
 
 
+class Deferred(object):
+    """ Placeholder for a deferred column which has not been retrieved yet """
+    def __reduce__(self):
+        # unpickles as the module's own placeholder, so identity checks hold
+        return 'DEFERRED'
+
+    def __repr__(self):
+        return 'DEFERRED'
+
+
+DEFERRED = Deferred()
+
+
+class DeferredColumn(object):
+    """
+    Scene column which is only selected from the database on first access
+    """
+    def __init__(self, name):
+        self.name = name
+        self.attr = '_{}'.format(name)
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.attr)
+        if value is DEFERRED:
+            obj.load_deferred()
+            value = getattr(obj, self.attr)
+        return value
+
+    def __set__(self, obj, value):
+        setattr(obj, self.attr, value)
+
+
 class Scene(object):
     """
     Class for interacting with the ordering_scene table
     and holding specific scene information
     """
 
-    base_sql = ('SELECT * '
+    # large text columns, left out of selects until first accessed
+    deferred_cols = ('log_file_contents', 'note')
+    log_file_contents = DeferredColumn('log_file_contents')
+    note = DeferredColumn('note')
+
+    # all other ordering_scene columns
+    lazy_cols = ('id', 'name', 'order_id', 'product_distro_location',
+                 'product_dload_url', 'cksum_distro_location',
+                 'cksum_download_url', 'status', 'processing_location',
+                 'completion_date', 'ee_unit_id', 'tram_order_id',
+                 'sensor_type', 'job_name', 'retry_after', 'retry_limit',
+                 'retry_count', 'reported_orphan', 'orphaned',
+                 'download_size', 'failed_lta_status_update',
+                 'status_modified')
+
+    __slots__ = lazy_cols + ('_log_file_contents', '_note',
+                             '_order_attrs', '_saved')
+
+    base_sql = ('SELECT ' + ', '.join(lazy_cols) + ' '
                 'FROM ordering_scene '
                 'WHERE ')
 
-    def __init__(self, id=None, name=None, note=None, order_id=None,
+    eager_sql = ('SELECT * '
+                 'FROM ordering_scene '
+                 'WHERE ')
+
+    # ordering_order columns fetched alongside a scene by get_context
+    context_order_cols = ('orderid', 'status', 'order_source', 'ee_order_id')
+
+    # columns written by save
+    save_cols = ('status', 'cksum_download_url', 'log_file_contents',
+                 'processing_location', 'retry_after', 'job_name',
+                 'note', 'retry_count', 'sensor_type',
+                 'product_dload_url', 'tram_order_id',
+                 'completion_date', 'ee_unit_id', 'retry_limit',
+                 'cksum_distro_location', 'product_distro_location',
+                 'reported_orphan', 'orphaned', 'failed_lta_status_update',
+                 'download_size', 'status_modified')
+
+    def __init__(self, id=None, name=None, note=DEFERRED, order_id=None,
                  product_distro_location=None, product_dload_url=None,
                  cksum_distro_location=None, cksum_download_url=None,
                  status=None, processing_location=None,
-                 completion_date=None, log_file_contents=None,
+                 completion_date=None, log_file_contents=DEFERRED,
                  ee_unit_id=None, tram_order_id=None, sensor_type=None,
                  job_name=None, retry_after=None, retry_limit=None,
                  retry_count=None, reported_orphan=None, orphaned=None,
@@ -86,36 +159,44 @@ class Scene(object):
         self.failed_lta_status_update = failed_lta_status_update
         self.status_modified = status_modified
 
-        if id:
-            # no need to query the DB again
-            self.id = id
-        else:
-            with db_instance() as db:
-                sql = ('select id '
-                       'from ordering_scene where '
-                       'name = %s '
-                       'and order_id = %s')
-                db.select(sql, (self.name, self.order_id))
+        # ordering_order column values already retrieved for this scene
+        self._order_attrs = dict()
+
+        # construction never queries, see lookup_id for finding an id
+        self.id = id
 
-                if db:
-                    self.id = db[0]['id']
-                else:
-                    self.id = None
+        self._mark_clean()
 
     def __repr__(self):
-        return 'Scene: {}'.format(self.as_dict())
+        # never queries, so logging a list of scenes stays cheap
+        return 'Scene: {}'.format(self.as_dict(deferred=False))
+
+    def __getstate__(self):
+        # slotted, so pickling (memcache) needs the state spelled out
+        return {k: getattr(self, k) for k in self.__slots__ if hasattr(self, k)}
 
-    def as_dict(self):
-        return {
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+    def as_dict(self, deferred=True):
+        """
+        :param deferred: load deferred columns, otherwise those not yet
+         retrieved are left out
+        :return: dict
+        """
+        resp = {
             "name": self.name,
-            "note": self.note,
             "status": self.status,
             "completion_date": self.completion_date,
             "cksum_download_url": self.cksum_download_url,
             "product_dload_url": self.product_dload_url,
-            "log_file_contents": self.log_file_contents,
             "id": self.id
         }
+        for col in self.deferred_cols:
+            if deferred or self._raw(col) is not DEFERRED:
+                resp[col] = getattr(self, col)
+        return resp
 
     @classmethod
     def get(cls, col_name, scene_name, orderid):
@@ -168,6 +249,166 @@ class Scene(object):
 
         return ret
 
+    @classmethod
+    def prefetch_sql(cls, order_cols, eager=False):
+        """
+        Base select for scenes joined to their order, with the requested
+        ordering_order columns aliased as order__<column>
+
+        :param order_cols: ordering_order columns to retrieve
+        :param eager: also select the deferred scene columns
+        :return: sql string, ready for the WHERE conditions
+        """
+        return cls.prefetch_select(order_cols, eager) + 'WHERE '
+
+    @classmethod
+    def prefetch_select(cls, order_cols, eager=False):
+        """
+        :return: sql string of the join, without conditions
+        """
+        if eager:
+            scene_cols = ['ordering_scene.*']
+        else:
+            scene_cols = ['ordering_scene.{}'.format(c) for c in cls.lazy_cols]
+        cols = ', '.join(scene_cols +
+                         ['ordering_order.{0} AS order__{0}'.format(c)
+                          for c in order_cols])
+        return ('SELECT {} '
+                'FROM ordering_scene '
+                'JOIN ordering_order '
+                'ON ordering_order.id = ordering_scene.order_id '
+                .format(cols))
+
+    @staticmethod
+    def _from_rows(rows, order_cols=None):
+        """
+        Build Scene objects from selected rows, moving any prefetched
+        order__<column> values into the order_attr cache
+
+        Scenes belonging to the same order share the same value objects,
+        so a parsed product_opts is only held once per order
+
+        :param rows: iterable of row dicts
+        :param order_cols: ordering_order columns included in the rows
+        :return: list of Scene objects
+        """
+        ret = list()
+        shared = dict()
+        for i in rows:
+            sd = dict(i)
+            order_attrs = dict()
+            for c in order_cols or ():
+                value = sd.pop('order__{}'.format(c))
+                order_attrs[c] = shared.setdefault((sd['order_id'], c), value)
+            obj = Scene(**sd)
+            obj._order_attrs.update(order_attrs)
+            ret.append(obj)
+        return ret
+
+    @classmethod
+    def prefetch_order_attrs(cls, scenes, order_cols):
+        """
+        Populate the order_attr cache for already retrieved scenes,
+        selecting the columns once per order rather than once per scene
+
+        :param scenes: list of Scene objects
+        :param order_cols: ordering_order columns to retrieve
+        :return: list of Scene objects
+        """
+        order_cols = tuple(order_cols)
+        missing = set(s.order_id for s in scenes
+                      if not all(c in s._order_attrs for c in order_cols))
+        if not missing:
+            return scenes
+
+        sql = ('SELECT id, {} FROM ordering_order WHERE id IN %s'
+               .format(', '.join(order_cols)))
+
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, (tuple(missing),))
+                logger.info('scene.py prefetch_order_attrs sql: {}'
+                            .format(log_sql))
+                db.select(sql, (tuple(missing),))
+                orders = dict((i['id'], i) for i in db)
+
+        except DBConnectException as e:
+            logger.critical('Error retrieving order attributes: {}\n'
+                            'sql: {}'.format(e.message, log_sql))
+            raise SceneException(e)
+
+        for scene in scenes:
+            if scene.order_id in orders:
+                row = orders[scene.order_id]
+                for c in order_cols:
+                    scene._order_attrs.setdefault(c, row[c])
+
+        return scenes
+
+    @classmethod
+    def get_contexts(cls, pairs, order_cols=None):
+        """
+        Retrieve scenes, along with columns from their associated order,
+        using a single query
+
+        :param pairs: list of (scene name, order longname) tuples
+        :param order_cols: ordering_order columns to retrieve,
+         defaults to context_order_cols
+        :return: dict of {(scene name, order longname): Scene}
+        """
+        if not pairs:
+            return dict()
+
+        if not order_cols:
+            order_cols = cls.context_order_cols
+        order_cols = tuple(set(order_cols) | {'orderid'})
+
+        sql = ('{} (ordering_scene.name, ordering_order.orderid) IN %s'
+               .format(cls.prefetch_sql(order_cols)))
+
+        pairs = tuple(tuple(p) for p in pairs)
+
+        ret = dict()
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, (pairs,))
+                logger.info('scene.py get_contexts sql: {}'.format(log_sql))
+                db.select(sql, (pairs,))
+
+            for obj in cls._from_rows(db, order_cols):
+                ret[(obj.name, obj._order_attrs['orderid'])] = obj
+
+        except DBConnectException as e:
+            logger.critical('Error retrieving scene contexts: {}\n'
+                            'sql: {}'.format(e.message, log_sql))
+            raise SceneException(e)
+
+        return ret
+
+    @classmethod
+    def get_context(cls, name, orderid, order_cols=None):
+        """
+        Retrieve a scene, along with columns from its associated order,
+        using a single query
+
+        :param name: scene/collection id
+        :param orderid: long name for the related order,
+         example@somewhere.com-12345
+        :param order_cols: ordering_order columns to retrieve
+        :return: Scene, with the order columns available from order_attr
+        """
+        found = cls.get_contexts([(name, orderid)], order_cols)
+
+        if (name, orderid) not in found:
+            logger.critical('Scene.get_context returned no results\n'
+                            'name: {} orderid: {}'.format(name, orderid))
+            raise SceneException('No scene {} found for order {}'
+                                 .format(name, orderid))
+
+        return found[(name, orderid)]
+
     @classmethod
     def create(cls, params):
         """
@@ -217,18 +458,29 @@ class Scene(object):
             raise SceneException(e.message)
 
     @classmethod
-    def where(cls, params):
+    def where(cls, params, prefetch=None, eager=False):
         """
         Query for a particular row in the ordering_scene table
 
         :param params: dictionary of column: value parameter to select on
+        :param prefetch: ordering_order columns to retrieve in the same
+         query, made available through order_attr
+        :param eager: also select the deferred columns, rather than
+         retrieving them on first access
         :return: list of matching Scene objects
         """
         if not isinstance(params, dict):
             raise SceneException('Where arguments must be '
                                  'passed as a dictionary')
 
-        sql, values = format_sql_params(cls.base_sql, params)
+        if prefetch:
+            params = dict(('ordering_scene.{}'.format(k), v)
+                          for k, v in params.items())
+            sql, values = format_sql_params(cls.prefetch_sql(prefetch, eager),
+                                            params)
+        else:
+            sql, values = format_sql_params(cls.eager_sql if eager
+                                            else cls.base_sql, params)
 
         ret = []
         log_sql = ''
@@ -237,10 +489,7 @@ class Scene(object):
                 log_sql = db.cursor.mogrify(sql, values)
                 logger.info('scene.py where sql: {}'.format(log_sql))
                 db.select(sql, values)
-                for i in db:
-                    sd = dict(i)
-                    obj = Scene(**sd)
-                    ret.append(obj)
+                ret = cls._from_rows(db, prefetch)
         except DBConnectException as e:
             logger.critical('Error retrieving scenes: {}\n'
                             'sql: {}'.format(e.message, log_sql))
@@ -248,6 +497,68 @@ class Scene(object):
 
         return ret
 
+    @classmethod
+    def query(cls, params=None, prefetch=None):
+        """
+        Build a query against the ordering_scene table, supporting
+        ordering, limits, projection and counts
+
+        :param params: dictionary of column: value parameter to select on
+        :param prefetch: ordering_order columns to retrieve in the same
+         query, made available through order_attr
+        :return: Query, whose all() returns Scene objects
+        """
+        if not prefetch:
+            return Query('ordering_scene', params, build=cls._from_rows,
+                         columns=cls.lazy_cols, exception=SceneException)
+
+        # the join is wrapped up as ordering_scene, so filters and
+        # ordering keep using plain scene column names
+        prefetch = tuple(prefetch)
+        return Query('ordering_scene', params,
+                     build=functools.partial(cls._from_rows,
+                                             order_cols=prefetch),
+                     columns=cls.lazy_cols + tuple('order__{}'.format(c)
+                                                   for c in prefetch),
+                     exception=SceneException,
+                     source='({}) AS ordering_scene'
+                            .format(cls.prefetch_select(prefetch)))
+
+    @classmethod
+    def iter_where(cls, params, batch_size=1000):
+        """
+        Iterate over the matching scenes in batches, so large result sets
+        are never held in memory all at once
+
+        :param params: dictionary of column: value parameter to select on
+        :param batch_size: scenes to retrieve per query
+        :return: generator of Scene objects, in id order
+        """
+        if not isinstance(params, dict):
+            raise SceneException('Where arguments must be '
+                                 'passed as a dictionary')
+
+        return cls.query(params).iterate(batch_size)
+
+    @classmethod
+    def lookup_id(cls, name, order_id):
+        """
+        Retrieve the id of a scene from its name and order
+
+        :param name: scene/collection id
+        :param order_id: ordering_order.id of the associated order
+        :return: scene id, or None if not found
+        """
+        sql = ('select id '
+               'from ordering_scene where '
+               'name = %s '
+               'and order_id = %s')
+
+        with db_instance() as db:
+            db.select(sql, (name, order_id))
+
+        return db[0]['id'] if db else None
+
     @classmethod
     def by_name_orderid(cls, name, order_id):
         try:
@@ -256,13 +567,21 @@ class Scene(object):
             return None
 
     @classmethod
-    def find(cls, ids):
+    def find(cls, ids, prefetch=None, eager=False):
         """
         Retrieve scene objects by id
         :param ids: list of scene ids, or single scene id
+        :param prefetch: ordering_order columns to retrieve in the same
+         query, made available through order_attr
+        :param eager: also select the deferred columns
         :return: list
         """
-        sql = '{} id IN %s;'.format(cls.base_sql)
+        if prefetch:
+            sql = '{} ordering_scene.id IN %s;'.format(
+                cls.prefetch_sql(prefetch, eager))
+        else:
+            sql = '{} id IN %s;'.format(cls.eager_sql if eager
+                                        else cls.base_sql)
         resp = list()
         if not isinstance(ids, list) and not isinstance(ids, int):
             raise SceneException("a list of integers, or a single integer, "
@@ -282,10 +601,7 @@ class Scene(object):
             db.select(sql, [tuple(ids)])
 
         if db:
-            for i in db:
-                sd = dict(i)
-                obj = Scene(**sd)
-                resp.append(obj)
+            resp = cls._from_rows(db, prefetch)
 
         if _single:
             return resp[0]
@@ -306,7 +622,8 @@ class Scene(object):
         if not isinstance(updates, dict):
             raise TypeError('Scene.bulk_update updates should be a dict')
 
-        sql = 'UPDATE ordering_scene SET %s = %s WHERE id in %s'
+        # ROW() keeps a single column valid for PostgreSQL 10+
+        sql = 'UPDATE ordering_scene SET %s = ROW%s WHERE id in %s'
 
         fields = '({})'.format(','.join(updates.keys()))
         vals = tuple(updates.values())
@@ -330,6 +647,100 @@ class Scene(object):
 
         return True
 
+    @classmethod
+    def update_where(cls, params, updates, returning='id'):
+        """
+        Update the rows matching params, without retrieving them first
+
+        :param params: dictionary of column: value parameter to select on
+        :param updates: dictionary of column: new value
+        :param returning: column to return for each updated scene
+        :return: list of the returning column values, one per updated scene
+        """
+        if not isinstance(params, dict) or not isinstance(updates, dict):
+            raise SceneException('update_where arguments must be '
+                                 'passed as dictionaries')
+
+        sql, values = format_update_params('ordering_scene', updates, params,
+                                           returning)
+
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                log_sql = db.cursor.mogrify(sql, values)
+                logger.info('scene.py update_where sql: {}'.format(log_sql))
+                db.execute(sql, values)
+                db.commit()
+                ret = [i[returning] for i in db]
+        except DBConnectException as e:
+            logger.critical('Error updating scenes: {}\n'
+                            'sql: {}'.format(e.message, log_sql))
+            raise SceneException(e)
+
+        return ret
+
+    @classmethod
+    def bulk_update_rows(cls, rows):
+        """
+        Update a list of scenes, each with its own values, within a
+        single transaction
+
+        Rows sharing the same set of columns are written by one statement,
+        typed against the ordering_scene row definition
+
+        :param rows: list of (scene id, {column: value}) tuples
+        :return: True
+        """
+        if not isinstance(rows, (list, tuple)):
+            raise TypeError('Scene.bulk_update_rows rows should be a list')
+
+        groups = dict()
+        for sid, updates in rows:
+            if not isinstance(updates, dict):
+                raise TypeError('Scene.bulk_update_rows updates should '
+                                'be a dict')
+            if not updates:
+                continue
+            row = dict(updates, id=sid)
+            groups.setdefault(tuple(sorted(updates)), []).append(row)
+
+        if not groups:
+            return True
+
+        sql = ('UPDATE ordering_scene SET {} '
+               'FROM json_populate_recordset(NULL::ordering_scene, %s) AS v '
+               'WHERE ordering_scene.id = v.id')
+
+        log_sql = ''
+        try:
+            with db_instance() as db:
+                for cols, group in groups.items():
+                    group_sql = sql.format(', '.join('{0} = v.{0}'.format(c)
+                                                     for c in cols))
+                    params = (Json(group, dumps=cls._dumps),)
+                    log_sql = db.cursor.mogrify(group_sql, params)
+                    logger.info('\n*** Bulk Updating {} scenes: {}\n***\n'
+                                .format(len(group), ', '.join(cols)))
+                    db.execute(group_sql, params)
+                db.commit()
+        except DBConnectException as e:
+            logger.critical('Error scene bulk_update_rows: {}\nSQL: {}'
+                            .format(e.message, log_sql))
+            raise SceneException(e)
+
+        return True
+
+    @staticmethod
+    def _dumps(obj):
+        """
+        Serialize bulk update rows, dates are written as ISO 8601 strings
+        """
+        def default(o):
+            if isinstance(o, (datetime.datetime, datetime.date)):
+                return o.isoformat()
+            raise TypeError('{!r} is not JSON serializable'.format(o))
+        return json.dumps(obj, default=default)
+
     def update(self, att, val):
         """
         Update a specifed column value for this Scene object
@@ -357,54 +768,121 @@ class Scene(object):
 
         return self.__getattribute__(att)
 
-    def save(self):
+    def _raw(self, col):
+        """
+        Column value as held, without loading deferred columns
+        """
+        if col in self.deferred_cols:
+            return getattr(self, '_{}'.format(col))
+        return getattr(self, col)
+
+    def load_deferred(self):
+        """
+        Retrieve any deferred columns which have not yet been loaded
+        """
+        missing = [c for c in self.deferred_cols if self._raw(c) is DEFERRED]
+        if not missing:
+            return
+
+        row = dict.fromkeys(missing)
+        if self.id is not None:
+            sql = ('SELECT {} FROM ordering_scene WHERE id = %s'
+                   .format(', '.join(missing)))
+            log_sql = ''
+            try:
+                with db_instance() as db:
+                    log_sql = db.cursor.mogrify(sql, (self.id,))
+                    db.select(sql, (self.id,))
+                    if db:
+                        row = dict(db[0])
+            except DBConnectException as e:
+                logger.critical('Error loading deferred scene columns: {}\n'
+                                'sql: {}'.format(e.message, log_sql))
+                raise SceneException(e)
+
+        for col in missing:
+            setattr(self, col, row[col])
+        self._saved = tuple(row[c] if c in missing else v
+                            for c, v in zip(self.save_cols, self._saved))
+
+    def _mark_clean(self):
+        """
+        Remember the saved column values, for use by changed_fields,
+        as a tuple in save_cols order to keep scenes small
+        """
+        self._saved = tuple(self._raw(c) for c in self.save_cols)
+
+    def changed_fields(self):
+        """
+        Columns whose values differ from when the scene was last
+        retrieved or saved
+
+        :return: tuple of column names
+        """
+        return tuple(c for c, saved in zip(self.save_cols, self._saved)
+                     if self._raw(c) is not DEFERRED
+                     and self._raw(c) != saved)
+
+    def save(self, changed_only=False):
         """
         Save the current configuration of the scene object to the DB
+
+        :param changed_only: only write the columns modified since the
+         scene was retrieved or last saved
         """
-        sql = 'UPDATE ordering_scene SET %s = %s WHERE id = %s'
+        if changed_only:
+            attr_tup = self.changed_fields()
+            if not attr_tup:
+                return
+        else:
+            # deferred columns which were never loaded are left as they are
+            attr_tup = tuple(c for c in self.save_cols
+                             if self._raw(c) is not DEFERRED)
 
-        attr_tup = ('status', 'cksum_download_url', 'log_file_contents',
-                    'processing_location', 'retry_after', 'job_name',
-                    'note', 'retry_count', 'sensor_type',
-                    'product_dload_url', 'tram_order_id',
-                    'completion_date', 'ee_unit_id', 'retry_limit',
-                    'cksum_distro_location', 'product_distro_location',
-                    'reported_orphan', 'orphaned', 'failed_lta_status_update',
-                    'download_size', 'status_modified')
+        sql = ('UPDATE ordering_scene SET {} WHERE id = %s RETURNING {}'
+               .format(', '.join('{} = %s'.format(c) for c in attr_tup),
+                       ', '.join(self.lazy_cols)))
 
-        vals = tuple(self.__getattribute__(v) for v in attr_tup)
-        cols = '({})'.format(','.join(attr_tup))
+        vals = tuple(self._raw(v) for v in attr_tup)
 
         log_sql = ''
         try:
             with db_instance() as db:
-                log_sql = db.cursor.mogrify(sql, (db_extns.AsIs(cols),
-                                                  vals, self.id))
+                log_sql = db.cursor.mogrify(sql, vals + (self.id,))
 
-                db.execute(sql, (db_extns.AsIs(cols), vals, self.id))
+                db.execute(sql, vals + (self.id,))
                 db.commit()
                 logger.info('\n*** Saved updates to scene id: {}, name:{}\n'
                             'sql: {}\n args: {}\n***'
                             .format(self.id, self.name,
                                     log_sql, zip(attr_tup, vals)))
+                new = dict(db[0])
         except DBConnectException as e:
             logger.critical("Error saving scene: {}\n"
                             "sql: {}".format(e.message, log_sql))
             raise SceneException(e)
+        except IndexError:
+            logger.critical('Error saving scene, no row updated\n'
+                            'sql: {}'.format(log_sql))
+            raise SceneException('No scene found with id {}'.format(self.id))
 
-        new = Scene.where({'id': self.id})[0]
+        for att, val in new.items():
+            self.__setattr__(att, val)
 
-        for att in attr_tup:
-            self.__setattr__(att, new.__getattribute__(att))
+        self._mark_clean()
 
     def order_attr(self, col):
         """
         Select the column value from the ordering_order table for this
-        specific scene
+        specific scene. Only values loaded by a prefetch are reused, others
+        are selected on every call, as the order may have changed since
 
         :param col: column to select on
         :return: value
         """
+        if col in self._order_attrs:
+            return self._order_attrs[col]
+
         sql = ('SELECT %s '
                'FROM ordering_scene JOIN ordering_order '
                'ON ordering_order.id = ordering_scene.order_id '
@@ -5,7 +5,8 @@ Author: David V. Hill
 """
 import os
 import re
-from collections import namedtuple
+import threading
+from collections import namedtuple, OrderedDict
 
 import yaml
 
@@ -563,6 +564,58 @@ class SensorCONST(object):
     }
 
 
+class SensorDispatch(object):
+    """
+    Picks the candidate sensor by the product id prefix (lc08, mod09a1, ...)
+    and applies only its precompiled pattern, remembering parsed products
+    in a bounded LRU cache
+    """
+    prefix_regex = re.compile(r'^\^([a-z0-9]+)')
+    split_regex = re.compile(r'[_.]')
+
+    def __init__(self, instances, maxsize=10000):
+        # {prefix: (shortname, compiled regex, class object)}
+        self.prefixes = dict()
+        for key, (regex, cls, _) in instances.items():
+            prefix = self.prefix_regex.match(regex).group(1)
+            self.prefixes[prefix] = (key, re.compile(regex), cls)
+
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def match(self, _id):
+        """
+        Find the sensor for a lowercase product id
+
+        :param _id: lowercase product id, without file extension
+        :return: (shortname, class object) or None
+        """
+        candidate = self.prefixes.get(self.split_regex.split(_id, 1)[0])
+        if candidate and candidate[1].match(_id):
+            return candidate[0], candidate[2]
+        return None
+
+    def get(self, product_id):
+        with self.lock:
+            inst = self.cache.pop(product_id, None)
+            if inst is not None:
+                self.cache[product_id] = inst
+            return inst
+
+    def put(self, product_id, inst):
+        with self.lock:
+            self.cache[product_id] = inst
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+dispatch = SensorDispatch(SensorCONST.instances)
+
+
 def instance(product_id):
     """
     Supported MODIS products
@@ -575,7 +628,14 @@ def instance(product_id):
     LT04 LT05 LE07 LC08 LO08
 
     LANDSAT FORMAT: LE07_L1TP_026027_20170912_20171008_01_T1
+
+    Parsed products are cached, so callers must treat them as read-only
     """
+    inst = dispatch.get(product_id)
+    if inst is not None:
+        return inst
+
+    cache_key = product_id
 
     # remove known file extensions before comparison
     # do not alter the case of the actual product_id!
@@ -595,13 +655,13 @@ def instance(product_id):
         product_id = product_id[0:index]
         _id = _id[0:index]
 
-    instances = SensorCONST.instances
-
-    for key in instances.iterkeys():
-        if re.match(instances[key][0], _id):
-            inst = instances[key][1](product_id.strip())
-            inst.shortname = key
-            return inst
+    found = dispatch.match(_id)
+    if found:
+        key, cls = found
+        inst = cls(product_id.strip())
+        inst.shortname = key
+        dispatch.put(cache_key, inst)
+        return inst
 
     msg = u"[{0:s}] is not a supported sensor product".format(product_id)
     raise ProductNotImplemented(msg)
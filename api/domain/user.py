@@ -7,6 +7,7 @@ from passlib.hash import pbkdf2_sha256
 from validate_email import validate_email
 
 from api.domain import format_sql_params
+from api.domain.query import Query
 from api.domain.order import Order
 from api.domain.scene import Scene
 from api.external.ers import ERSApi
@@ -23,16 +24,34 @@ class UserException(Exception):
 
 class User(object):
 
-    base_sql = "SELECT username, email, first_name, last_name, contactid "\
+    __slots__ = ('_username', '_email', '_first_name', '_last_name',
+                 '_contactid', '_id', '_roles')
+
+    role_cols = ('is_staff', 'is_active', 'is_superuser')
+
+    base_sql = "SELECT id, username, email, first_name, last_name, contactid, "\
+                "is_staff, is_active, is_superuser "\
                 "FROM auth_user WHERE "
 
-    def __init__(self, username, email, first_name, last_name, contactid):
+    # seconds between recording last_login for a returning user
+    login_interval = 900
+
+    def __init__(self, username, email, first_name, last_name, contactid,
+                 id=None, roles=None):
+        """
+        Without an id the user is found, or created, in auth_user and
+        its last_login recorded; with an id nothing is written
+
+        :param id: auth_user.id, when hydrating from a selected row
+        :param roles: dictionary of the role_cols, if already known
+        """
+        self._roles = roles
         self.username = username
         self.email = email
         self.first_name = first_name
         self.last_name = last_name
         self.contactid = contactid
-        self.id = self.find_or_create_user()
+        self.id = id if id is not None else self.find_or_create_user()
 
     @property
     def username(self):
@@ -97,6 +116,14 @@ class User(object):
     def __repr__(self):
         return self.as_dict()
 
+    def __getstate__(self):
+        # slotted, so pickling (memcache) needs the state spelled out
+        return {k: getattr(self, k) for k in self.__slots__ if hasattr(self, k)}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
     @classmethod
     def get(cls, username, password):
         if username == 'espa_admin':
@@ -111,9 +138,29 @@ class User(object):
             eu = ers.get_user_info(username, password)
             return eu['username'], eu['email'], eu['firstName'], eu['lastName'], eu['contact_id']
 
+    @classmethod
+    def from_login(cls, user_entry, seen=None):
+        """
+        Build the User for an authenticated request
+
+        The auth_user upsert, which records last_login, only runs when
+        there is no record of a previous one within login_interval
+
+        :param user_entry: (username, email, first_name, last_name, contactid)
+        :param seen: (user id, timestamp, roles) returned by a previous login
+        :return: User, (user id, timestamp, roles) of the last upsert
+        """
+        now = time.time()
+        if seen and now - seen[1] < cls.login_interval:
+            return cls(*user_entry, id=seen[0], roles=seen[2]), seen
+
+        user = cls(*user_entry)
+        return user, (user.id, now, user.roles())
+
     def find_or_create_user(self):
         """ check if user exists in our DB, if not create them
-            returns what should be assigned to self.id
+            returns what should be assigned to self.id, and caches the
+            user's roles from the same statement
         """
         (username, email, first_name, last_name, contactid) = (
             self.username, self.email, self.first_name, self.last_name, self.contactid)
@@ -126,8 +173,8 @@ class User(object):
                       "(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s) " \
                       "on conflict (username) " \
                       "do update set (email, contactid, last_login) = (%s, %s, %s) " \
-                      "where auth_user.username = %s" \
-                      "returning id"
+                      "where auth_user.username = %s " \
+                      "returning id, is_staff, is_active, is_superuser"
         arg_tup = (username, email, first_name, last_name,
                    'pass', 'f', 't', 'f', nownow, nownow, contactid,
                    email, contactid, nownow, username)
@@ -136,7 +183,9 @@ class User(object):
             try:
                 db.execute(insert_stmt, arg_tup)
                 db.commit()
-                user_id = db.fetcharr[0]['id']
+                row = db.fetcharr[0]
+                user_id = row['id']
+                self._roles = {c: row[c] for c in self.role_cols}
             except:
                 exc_type, exc_val, exc_trace = sys.exc_info()
                 logger.critical("ERR user find_or_create args {0} {1} " \
@@ -166,16 +215,34 @@ class User(object):
                 log_sql = db.cursor.mogrify(sql, values)
                 logger.info('user.py where sql: {}'.format(log_sql))
                 db.select(sql, values)
-                for i in db:
-                    obj = User(i["username"], i["email"], i["first_name"],
-                               i["last_name"], i["contactid"])
-                    ret.append(obj)
+                ret = cls._from_rows(db)
         except DBConnectException as e:
                 logger.critical('Error querying for users: {}\n'
                                 'sql: {}'.format(e.message, log_sql))
                 raise UserException(e)
         return ret
 
+    @staticmethod
+    def _from_rows(rows):
+        return [User(i["username"], i["email"], i["first_name"],
+                     i["last_name"], i["contactid"], id=i["id"],
+                     roles={c: i[c] for c in User.role_cols})
+                for i in rows]
+
+    @classmethod
+    def query(cls, params=None):
+        """
+        Build a query against the auth_user table, supporting
+        ordering, limits, projection and counts
+
+        :param params: dictionary of column: value parameters
+        :return: Query, whose all() returns User objects
+        """
+        return Query('auth_user', params, build=cls._from_rows,
+                     columns=('id', 'username', 'email', 'first_name',
+                              'last_name', 'contactid') + cls.role_cols,
+                     exception=UserException)
+
     @classmethod
     def by_contactid(cls, contactid):
         try:
@@ -212,10 +279,7 @@ class User(object):
             db.select(sql, [tuple(ids)])
 
         if db:
-            for i in db:
-                obj = User(i["username"], i["email"], i["first_name"],
-                               i["last_name"], i["contactid"])
-                resp.append(obj)
+            resp = cls._from_rows(db)
 
         if _single:
             return resp[0]
@@ -223,7 +287,10 @@ class User(object):
             return resp
 
     def update(self, att, val):
-        self.__setattr__(att, val)
+        if att in self.role_cols:
+            self.roles()[att] = val
+        else:
+            self.__setattr__(att, val)
         if isinstance(val, str) or isinstance(val, datetime.datetime):
             val = "\'{0}\'".format(val)
         sql = "update auth_user set {0} = {1} where id = {2};".format(att, val, self.id)
@@ -233,17 +300,23 @@ class User(object):
         return True
 
     def roles(self):
-        result = None
+        """
+        Roles are normally loaded along with the user row, they are only
+        selected here, once, for users constructed without them
+        """
+        if self._roles is not None:
+            return self._roles
+
         with db_instance() as db:
-            db.select("select is_staff, is_active, is_superuser from auth_user where id = %s;" % self.id)
+            db.select("select is_staff, is_active, is_superuser from auth_user where id = %s;", (self.id,))
         try:
-            result = db[0]
+            self._roles = {c: db[0][c] for c in self.role_cols}
         except:
             exc_type, exc_val, exc_trace = sys.exc_info()
             logger.critical("ERR retrieving roles for user. msg{0} trace{1}".format(exc_val, traceback.format_exc()))
             raise exc_type, exc_val, exc_trace
 
-        return result
+        return self._roles
 
     def is_staff(self):
         return self.roles()['is_staff']
@@ -256,12 +329,13 @@ class User(object):
         return self.roles()['is_superuser']
 
     def role_list(self):
+        roles = self.roles()
         out_list = []
-        if self.is_staff():
+        if roles['is_staff']:
             out_list.append('staff')
-        if self.is_superuser():
+        if roles['is_superuser']:
             out_list.append('super')
-        if self.active():
+        if roles['is_active']:
             out_list.append('active')
 
         return out_list
@@ -4,7 +4,7 @@ Author: Clay Austin
 '''
 from api.system.logger import ilogger as logger
 
-import requests
+from api.util.connections import http_session, TIMEOUT
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 
 cfg = ConfigurationProvider()
@@ -33,8 +33,9 @@ class ERSApi(object):
         verify = True if cfg.mode == 'ops' else False
         try:
             logger.debug('[%s] %s', verb.upper(), self._host+url)
-            resp = getattr(requests, verb)(self._host + url, data=data,
-                                           headers=header, verify=verify)
+            resp = getattr(http_session(), verb)(self._host + url, data=data,
+                                                 headers=header, verify=verify,
+                                                 timeout=TIMEOUT)
             resp.raise_for_status()
         except Exception as e:
             raise ERSApiConnectionException(e)
@@ -31,13 +31,7 @@ class HadoopHandler(object):
 
     def job_names_ids(self):
         cache_key = "jobs_names_cache"
-        resp = cache.get(cache_key)
-
-        if not resp:
-            resp = self.list_jobs()
-            cache.set(cache_key, resp, 180)
-
-        return resp
+        return cache.get_or_compute(cache_key, self.list_jobs, 180)
 
     def slave_ips(self):
         _stdout = self._remote_cmd("cat ~/bin/hadoop/etc/hadoop/slaves")['stdout']
@@ -1,6 +1,7 @@
 """
 TODO: Replaces lta.py
 """
+import os
 import json
 import urllib
 import traceback
@@ -16,11 +17,21 @@ from api.domain import sensor
 from api.providers.configuration.configuration_provider import (
     ConfigurationProvider)
 from api.providers.caching.caching_provider import CachingProvider
+from api.domain.m2m_entity import M2MEntity, M2MEntityException
 from api.system.logger import ilogger as logger
+from api.util.connections import http_session, thread_pool, TIMEOUT
 
 
 config = ConfigurationProvider()
 
+# IDs sent in a single idLookup/download request, and requests in flight
+LOOKUP_CHUNK_SIZE = int(os.getenv('ESPA_M2M_LOOKUP_CHUNK', 1000))
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('ESPA_M2M_DOWNLOAD_CHUNK', 500))
+WORKERS = int(os.getenv('ESPA_M2M_WORKERS', 4))
+
+# seconds a resolved entity ID, or a display ID M2M did not find, is cached
+ENTITY_TTL = int(os.getenv('ESPA_M2M_ENTITY_TTL', 2592000))
+MISSING_TTL = int(os.getenv('ESPA_M2M_MISSING_TTL', 900))
 
 
 # -----------------------------------------------------------------------------+
@@ -38,7 +49,60 @@ def split_by_dataset(product_ids):
                 lambda x: sensor.instance(x).lta_json_name)}
 
 
+def chunks(items, size):
+    """
+    Split a list into consecutive pieces of at most size items
+
+    :param items: list to split
+    :param size: largest piece
+    :return: list of lists
+    """
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def dispatch(func, jobs, workers=None):
+    """
+    Call func(*job) for each job, concurrently on the thread pool when there
+    is more than one. A job must not dispatch more than one job of its own
+
+    :param func: callable
+    :param jobs: list of argument tuples
+    :param workers: most calls in flight at once
+    :return: list of (job, result, exception or None), in the order of jobs
+    """
+    if len(jobs) < 2:
+        pending = [(job, None) for job in jobs]
+    else:
+        pool = thread_pool(workers or WORKERS)
+        pending = [(job, pool.apply_async(func, job)) for job in jobs]
+
+    results = list()
+    for job, result in pending:
+        try:
+            results.append((job, result.get() if result is not None else func(*job), None))
+        except Exception as e:
+            results.append((job, None, e))
+    return results
+
+
+def gather(func, jobs, workers=None):
+    """
+    Merge the dict results of dispatch(), raising the first error
+
+    :return: dict
+    """
+    merged = dict()
+    for job, result, error in dispatch(func, jobs, workers):
+        if error is not None:
+            raise error
+        merged.update(result)
+    return merged
+
+
 class LTAService(object):
+    _local_ip = None
+
     def __init__(self, token=None, current_user=None, ipaddr=None):
         mode = config.mode
         self.api_version = config.get('bulk.{0}.json.version'.format(mode))
@@ -47,7 +111,7 @@ class LTAService(object):
         self.base_url = config.url_for('earthexplorer.json')
         self.current_user = current_user  # CONTACT ID
         self.token = token
-        self.ipaddr = ipaddr or socket.gethostbyaddr(socket.gethostname())[2][0]
+        self.ipaddr = ipaddr or self.local_ip()
 
         self.external_landsat_regex = re.compile(config.url_for('landsat.external'))
         self.landsat_datapool = config.url_for('landsat.datapool')
@@ -57,6 +121,24 @@ class LTAService(object):
         if self.current_user and self.token:
             self.set_user_context(self.current_user, ipaddress=self.ipaddr)
 
+    @staticmethod
+    def local_ip():
+        if LTAService._local_ip is None:
+            LTAService._local_ip = socket.gethostbyaddr(socket.gethostname())[2][0]
+        return LTAService._local_ip
+
+    @classmethod
+    def client(cls, token=None):
+        """
+        Build a client from the current configuration, which is served from
+        the process' snapshot, so configuration changes apply to the next
+        call. Connections are reused through the shared http_session
+
+        :param token: API key for the returned client
+        :return: LTAService
+        """
+        return cls(token=token)
+
     def network_urls(self, urls, sensor='landsat'):
         """ Convert External URLs to 'Internal' (on our 10GbE network) """
         match = {'landsat': self.landsat_datapool,
@@ -120,7 +202,7 @@ class LTAService(object):
         if 'password' not in str(data):
             logger.debug('Payload: {}'.format(data))
         # Note: using `data=` (to force form-encoded params)
-        response = getattr(requests, verb)(url, data=data)
+        response = getattr(http_session(), verb)(url, data=data, timeout=TIMEOUT)
         logger.debug('[RESPONSE] %s\n%s', response, response.content)
         return self._parse(response)
 
@@ -151,7 +233,7 @@ class LTAService(object):
         """
         url = self.base_url + 'login'
         logger.debug('HEAD {}'.format(url))
-        resp = requests.head(url)
+        resp = http_session().head(url, timeout=TIMEOUT)
         return resp.ok
 
     def logout(self):
@@ -174,14 +256,21 @@ class LTAService(object):
              retdata.update(self.id_lookup(id_list, sensor_name))
         return retdata
 
-    def id_lookup(self, product_ids, dataset):
+    def id_lookup(self, product_ids, dataset, chunk_size=None):
         """
-        Convert Collection IDs (LC08_...) into M2M entity IDs
+        Convert Collection IDs (LC08_...) into M2M entity IDs, requesting
+            chunks of IDs concurrently
 
         :param product_ids: Landsat Collection IDs ['LC08_..', ...]
         :type product_ids: list
+        :param chunk_size: most IDs in a single request
         :return: dict
         """
+        jobs = [(c, dataset) for c in
+                chunks(product_ids, chunk_size or LOOKUP_CHUNK_SIZE)]
+        return gather(self._id_lookup, jobs)
+
+    def _id_lookup(self, product_ids, dataset):
         endpoint = 'idLookup'
         id_list = [i for i in product_ids]
         if dataset.startswith('MODIS'):
@@ -213,7 +302,7 @@ class LTAService(object):
         return {k: entity_ids.get(k) is not None for k in product_ids}
 
     def get_download_urls(self, entity_ids, dataset, products='STANDARD',
-                          stage=True, usage='[espa]:sr'):
+                          stage=True, usage='[espa]:sr', chunk_size=None):
         """
         Fetch the download location for supplied IDs, replacing the public host
             with an internal network host (to bypass public firewall routing)
@@ -226,17 +315,23 @@ class LTAService(object):
         :type stage: bool
         :param usage: Identify higher level products this data is used to create
         :type usage: str
+        :param chunk_size: most IDs in a single request
         :return: dict
         """
+        jobs = [(c, dataset, products, stage, usage) for c in
+                chunks(entity_ids, chunk_size or DOWNLOAD_CHUNK_SIZE)]
+        return self.network_urls(
+                   self.network_urls(
+                       gather(self._download, jobs),
+                    'landsat'), 'modis')
+
+    def _download(self, entity_ids, dataset, products, stage, usage):
         payload = dict(apiKey=self.token, datasetName=dataset,
                         products=products, entityIds=entity_ids,
                         stage=stage, dataUse=usage)
         resp = self._post('download', payload)
         results = resp.get('data')
-        return self.network_urls(
-                   self.network_urls(
-                       {i['entityId']: i['url'] for i in results},
-                    'landsat'), 'modis')
+        return {i['entityId']: i['url'] for i in results}
 
     def set_user_context(self, contactid, ipaddress=None, context='ESPA'):
         """
@@ -283,7 +378,8 @@ class LTACachedService(LTAService):
         # TODO: need to profile how much data we are caching
         one_hour = 3600  # seconds
         self.MC_KEY_FMT = '({resource})'
-        self.cache = CachingProvider(timeout=one_hour)
+        self.cache = CachingProvider(timeout=one_hour, local=True)
+        self.entity_cache = CachingProvider(timeout=ENTITY_TTL)
 
     def get_login(self):
         cache_key = self.MC_KEY_FMT.format(resource='login')
@@ -297,11 +393,74 @@ class LTACachedService(LTAService):
             logger.error('LTACachedService: Token not cached')
 
     def cached_login(self):
-        token = self.get_login()
-        if token is None:
-            token = self.login()
-            self.set_login(token)
-        return token
+        cache_key = self.MC_KEY_FMT.format(resource='login')
+        return self.cache.get_or_compute(cache_key, self.login)
+
+    def _entity_key(self, product_id):
+        return self.MC_KEY_FMT.format(resource='entity.' + product_id)
+
+    def _cache_entities(self, entity_ids):
+        found = {self._entity_key(k): v for k, v in entity_ids.items() if v}
+        # known missing IDs are stored empty, memcache cannot hold None
+        missing = {self._entity_key(k): '' for k, v in entity_ids.items() if not v}
+        for values, ttl in ((found, ENTITY_TTL), (missing, MISSING_TTL)):
+            if values and not self.entity_cache.set_multi(values, ttl):
+                logger.error('LTACachedService: Entity IDs not cached')
+
+    def get_lookup(self, product_ids):
+        """
+        Entity IDs already resolved, from memcache or else the local table
+
+        :param product_ids: Collection IDs ['LC08_..', ...]
+        :type product_ids: list
+        :return: dict {display id: entity id, or None if known missing},
+                 leaving out IDs which are not cached
+        """
+        keys = {self._entity_key(i): i for i in product_ids}
+        cached = self.entity_cache.get_multi(keys.keys())
+        results = {keys[k]: v or None for k, v in cached.items()}
+
+        uncached = [i for i in product_ids if i not in results]
+        if uncached:
+            try:
+                stored = M2MEntity.lookup(uncached, ENTITY_TTL, MISSING_TTL)
+            except M2MEntityException as e:
+                logger.warn('LTACachedService: Entity table lookup failed: {}'
+                            .format(e))
+                stored = dict()
+            self._cache_entities(stored)
+            results.update(stored)
+        return results
+
+    def set_lookup(self, entity_ids):
+        """
+        :param entity_ids: dict {display id: entity id, or None if missing}
+        """
+        self._cache_entities(entity_ids)
+        try:
+            M2MEntity.save(entity_ids)
+        except M2MEntityException as e:
+            logger.warn('LTACachedService: Entity table save failed: {}'
+                        .format(e))
+
+    def id_lookup(self, product_ids, dataset, chunk_size=None):
+        """
+        Convert Collection IDs (LC08_...) into M2M entity IDs, only asking
+            M2M for the IDs not already cached
+
+        :param product_ids: Landsat Collection IDs ['LC08_..', ...]
+        :type product_ids: list
+        :param chunk_size: most IDs in a single request
+        :return: dict
+        """
+        entity_ids = self.get_lookup(product_ids)
+        misses = [i for i in product_ids if i not in entity_ids]
+        if misses:
+            resolved = super(LTACachedService, self).id_lookup(misses, dataset,
+                                                               chunk_size)
+            self.set_lookup(resolved)
+            entity_ids.update(resolved)
+        return {k: entity_ids.get(k) for k in product_ids}
 
 
 ''' This is the public interface that calling code should use to interact
@@ -309,47 +468,83 @@ class LTACachedService(LTAService):
 
 
 def get_session():
-    return LTAService().login()
+    return LTAService.client().login()
 
 
 def logout(token):
-    return LTAService(token).logout()
+    return LTAService.client(token).logout()
 
 
 def convert(token, product_ids, dataset):
-    return LTAService(token).id_lookup(product_ids, dataset)
+    return LTACachedService.client(token).id_lookup(product_ids, dataset)
 
 
 def verify_scenes(token, product_ids, dataset):
-    return LTAService(token).verify_scenes(product_ids, dataset)
+    return LTACachedService.client(token).verify_scenes(product_ids, dataset)
 
 
 def get_download_urls(token, entity_ids, dataset, usage='[espa]'):
-    return LTAService(token).get_download_urls(entity_ids, dataset, usage=usage)
+    return LTAService.client(token).get_download_urls(entity_ids, dataset, usage=usage)
 
 
 def set_user_context(token, contactid, ipaddress=None):
-    return LTAService(token).set_user_context(contactid, ipaddress)
+    return LTAService.client(token).set_user_context(contactid, ipaddress)
 
 
 def clear_user_context(token):
-    return LTAService(token).clear_user_context()
+    return LTAService.client(token).clear_user_context()
 
 
 def available():
-    return LTAService().available()
+    return LTAService.client().available()
 
 
 def check_valid(token, product_ids):
-    return dict(z for d, l in split_by_dataset(product_ids).items()
-                 for z in verify_scenes(token, l, d).items())
+    jobs = [(token, c, d) for d, l in split_by_dataset(product_ids).items()
+            for c in chunks(l, LOOKUP_CHUNK_SIZE)]
+    return gather(verify_scenes, jobs)
 
 
-def download_urls(token, product_ids, dataset, usage='[espa]'):
+def _download_urls(token, product_ids, dataset, usage):
     entities = convert(token, product_ids, dataset)
     urls = get_download_urls(token, entities.values(), dataset, usage=usage)
     return {p: urls.get(e) for p, e in entities.items() if e in urls}
 
 
+def download_urls(token, product_ids, dataset=None, usage='[espa]',
+                  partial=False):
+    """
+    Fetch the download locations for Collection IDs, concurrently in chunks
+        across every dataset when none is given
+
+    :param partial: log chunks which failed and leave their IDs out,
+                    rather than raising
+    :return: dict
+    """
+    datasets = {dataset: product_ids} if dataset else split_by_dataset(product_ids)
+    size = min(LOOKUP_CHUNK_SIZE, DOWNLOAD_CHUNK_SIZE)
+    jobs = [(token, c, d, usage) for d, l in datasets.items()
+            for c in chunks(l, size)]
+    if not partial:
+        return gather(_download_urls, jobs)
+
+    urls = dict()
+    for job, result, error in dispatch(_download_urls, jobs):
+        if error is not None:
+            logger.error('Problem getting URLs for {} {} IDs: {}'
+                         .format(len(job[1]), job[2], error))
+        else:
+            urls.update(result)
+    return urls
+
+
 def get_cached_session():
-    return LTACachedService().cached_login()
+    return LTACachedService.client().cached_login()
+
+
+def get_cached_convert(token, product_ids):
+    return LTACachedService.client(token).easy_id_lookup(product_ids)
+
+
+def get_cached_verify_scenes(token, product_ids):
+    return check_valid(token, product_ids)
@@ -3,7 +3,10 @@ Purpose: lta services client module
 Author: David V. Hill
 '''
 
+import time
 import collections
+import threading
+import multiprocessing
 import xml.etree.ElementTree as xml
 from cStringIO import StringIO
 
@@ -14,9 +17,17 @@ from api.domain import sensor
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.system.logger import ilogger as logger
 from api import util as utils
+from api.util.connections import thread_pool
 
 config = ConfigurationProvider()
 
+UpdateOrderResponse = collections.namedtuple('UpdateOrderResponse',
+                                             ['success', 'message', 'status'])
+
+# {service client class: instance} for each thread, suds clients keep
+# per-call state and are not safe to share between threads
+_soap_clients = threading.local()
+
 
 def check_lta_available():
     """
@@ -50,6 +61,40 @@ class LTASoapService(LTAService):
             logger.info('Building SoapClient for:{0}'.format(self.url))
         self.client = SoapClient(self.url, location=self.location, cache=self.build_object_cache())
 
+    @classmethod
+    def pooled(cls):
+        """
+        Long-lived client for this service, so the WSDL is only parsed
+        the first time it is used by each thread
+
+        :return: service client instance
+        """
+        clients = _soap_clients.__dict__.setdefault('clients', dict())
+        if cls not in clients:
+            clients[cls] = cls()
+        return clients[cls]
+
+    @classmethod
+    def discard(cls):
+        """ Drop this thread's client, the next call builds a new one """
+        getattr(_soap_clients, 'clients', dict()).pop(cls, None)
+
+    @classmethod
+    def call(cls, method, *args):
+        """
+        Run a method on the pooled client, rebuilding the client on failure
+
+        :param method: name of the client method
+        :return: the method's return value
+        """
+        try:
+            return getattr(cls.pooled(), method)(*args)
+        except Exception as e:
+            logger.warn('{0} {1} failed, discarding client: {2}'
+                        .format(cls.__name__, method, e))
+            cls.discard()
+            raise
+
     def build_object_cache(self):
         cache = ObjectCache()
         cache.setduration(seconds=config.get('soap.client_timeout'))
@@ -132,9 +177,6 @@ class OrderUpdateServiceClient(LTASoapService):
         On failure, a tuple (False, failure message, failure status)
         '''
 
-        returnval = collections.namedtuple('UpdateOrderResponse',
-                                           ['success', 'message', 'status'])
-
         # resp = self.client.factory.create('StatusOrderReturn')
 
         try:
@@ -150,11 +192,11 @@ class OrderUpdateServiceClient(LTASoapService):
             raise e
 
         if resp.status == 'Pass':
-            return returnval(success=True, message=None, status=None)
+            return UpdateOrderResponse(success=True, message=None, status=None)
         else:
-            return returnval(success=False,
-                             message=resp.message,
-                             status=resp.status)
+            return UpdateOrderResponse(success=False,
+                                       message=resp.message,
+                                       status=resp.status)
 
 
 class OrderDeliveryServiceClient(LTASoapService):
@@ -211,9 +253,8 @@ class OrderDeliveryServiceClient(LTASoapService):
                             .format(u.unitNbr,u.orderNbr))
 
                 # we didn't get an email... fail the order
-                resp = OrderUpdateServiceClient().update_order(u.orderNbr,
-                                                               u.unitNbr,
-                                                               "R")
+                resp = OrderUpdateServiceClient.call('update_order', u.orderNbr,
+                                                     u.unitNbr, "R")
                 # we didn't get a response from the service
                 if not resp.success:
                     raise Exception('Could not update order[{0}] unit[{1}] '
@@ -235,9 +276,8 @@ class OrderDeliveryServiceClient(LTASoapService):
                             .format(u.unitNbr, u.orderNbr))
 
                 # didn't get an email... fail the order
-                resp = OrderUpdateServiceClient().update_order(u.orderNbr,
-                                                               u.unitNbr,
-                                                               "R")
+                resp = OrderUpdateServiceClient.call('update_order', u.orderNbr,
+                                                     u.unitNbr, "R")
                 # didn't get a response from the service
                 if not resp.success:
                     raise Exception('Could not update unit {0} in order {1} '
@@ -268,18 +308,116 @@ class OrderDeliveryServiceClient(LTASoapService):
 
 
 def get_user_name(contactid):
-    return RegistrationServiceClient().get_username(contactid)
+    return RegistrationServiceClient.call('get_username', contactid)
 
 
 def get_available_orders():
-    return OrderDeliveryServiceClient().get_available_orders()
+    return OrderDeliveryServiceClient.call('get_available_orders')
 
 
 def get_order_status(lta_order_number):
-    return OrderUpdateServiceClient().get_order_status(lta_order_number)
+    return OrderUpdateServiceClient.call('get_order_status', lta_order_number)
+
+
+def _run_concurrently(func, items, workers, timeout, name):
+    """
+    Apply func to each item on the thread pool
+
+    :param func: callable taking a single item
+    :param items: list of arguments
+    :param workers: number of concurrent calls
+    :param timeout: seconds to wait for all of the results
+    :param name: description of the calls, for logging
+    :return: list of (item, result), leaving out calls which timed out
+    """
+    pool = thread_pool(workers)
+    pending = [(item, pool.apply_async(func, (item,))) for item in items]
+
+    deadline = time.time() + timeout
+    results = list()
+    for item, result in pending:
+        try:
+            results.append((item, result.get(max(0, deadline - time.time()))))
+        except multiprocessing.TimeoutError:
+            logger.warn('Timed out on {0} for LTA order {1}'.format(name, item))
+    return results
+
+
+def _try_order_status(lta_order_number):
+    try:
+        return get_order_status(lta_order_number)
+    except Exception as e:
+        logger.warn('Could not retrieve status for LTA order {0}: {1}'
+                    .format(lta_order_number, e))
+        return None
+
+
+def get_order_statuses(lta_order_numbers, workers=10, timeout=120):
+    """
+    Retrieve the status of several orders concurrently
+
+    Orders whose status could not be retrieved, or was not returned within
+    timeout seconds of the first request, are left out of the results so
+    they are checked again on the next run
+
+    :param lta_order_numbers: list of EE order numbers
+    :param workers: number of concurrent requests
+    :param timeout: seconds to wait for all of the responses
+    :return: dict {order number: get_order_status() response}
+    """
+    results = _run_concurrently(_try_order_status, lta_order_numbers,
+                                workers, timeout, 'status request')
+    return {tid: status for tid, status in results if status is not None}
+
+
+def _update_units(lta_order_number, units):
+    """
+    Send the unit updates for a single order, one after another
+
+    :param lta_order_number: EE order number
+    :param units: list of (unit number, status)
+    :return: dict {unit number: None if accepted, else the error}
+    """
+    results = dict()
+    for unit_number, status in units:
+        try:
+            resp = update_order_status(lta_order_number, unit_number, status)
+            results[unit_number] = None if resp.success else \
+                '{0}: {1}'.format(resp.status, resp.message)
+        except Exception as e:
+            results[unit_number] = str(e) or repr(e)
+    return results
+
+
+def update_order_statuses(updates, workers=10, timeout=120):
+    """
+    Send several unit status updates, concurrently across orders
+
+    :param updates: list of (order number, unit number, status)
+    :param workers: number of concurrent requests
+    :param timeout: seconds to wait for all of the responses
+    :return: dict {(order number, unit number): None if accepted, else the error}
+    """
+    by_order = collections.OrderedDict()
+    for lta_order_number, unit_number, status in updates:
+        by_order.setdefault(lta_order_number, []).append((unit_number, status))
+
+    def update_order(lta_order_number):
+        return _update_units(lta_order_number, by_order[lta_order_number])
+
+    results = {(o, u): 'timed out' for o, u, _ in updates}
+    for lta_order_number, units in _run_concurrently(
+            update_order, by_order.keys(), workers, timeout, 'status update'):
+        for unit_number, error in units.items():
+            results[(lta_order_number, unit_number)] = error
+    return results
 
 
 def update_order_status(lta_order_number, unit_number, new_status):
-    return OrderUpdateServiceClient().update_order(lta_order_number,
-                                                   unit_number,
-                                                   new_status)
+    return OrderUpdateServiceClient.call('update_order', lta_order_number,
+                                         unit_number, new_status)
+
+
+def clear_clients():
+    """ Drop this thread's pooled SOAP clients """
+    _soap_clients.__dict__.pop('clients', None)
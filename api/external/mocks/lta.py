@@ -1,6 +1,7 @@
 import xml.etree.ElementTree as xml
 
 from api.util import chunkify
+from api.external.lta import UpdateOrderResponse
 
 
 def return_update_order_resp(*args, **kwargs):
@@ -28,7 +29,7 @@ def get_download_urls(product_list, contact_id):
 
 
 def update_order_status(ee_order_id, ee_unit_id, something):
-    return True, True, True
+    return UpdateOrderResponse(success=True, message=None, status=None)
 
 
 def update_order_status_fail(ee_order_id, ee_unit_id, something):
@@ -179,7 +179,7 @@ class API(object):
     def get_admin_whitelist(self):
         """
         Returns list of ip addresses for whitelist hosts accessing stats
-        :return: list of strings
+        :return: IPList
         """
         try:
             response = self.admin.admin_whitelist()
@@ -191,7 +191,7 @@ class API(object):
     def get_stat_whitelist(self):
         """
         Returns list of ip addresses for xymon monitoring application accessing stats
-        :return: list of strings
+        :return: IPList
         """
         try:
             response = self.admin.stat_whitelist()
@@ -169,7 +169,7 @@ class Emails(object):
         url = self.__order_status_url(order.orderid)
         bdl_url = "https://github.com/USGS-EROS/espa-bulk-downloader"
 
-        scenes = order.scenes()
+        scenes = order.scenes(eager=True)
         pbs = order.products_by_sensor()
 
         for product in scenes:
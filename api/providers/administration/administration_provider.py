@@ -9,13 +9,12 @@ from api.system.logger import ilogger as logger
 from api.util.dbconnect import db_instance
 from api.util.dbconnect import DBConnectException
 from api.domain.order import Order
-from api.domain.scene import SceneException
-from api.util import api_cfg
+from api.domain.scene import Scene, SceneException
+from api.util import cfg_ip_list
 
 
 class AdministrationProvider(AdminProviderInterfaceV0):
     config = ConfigurationProvider()
-    db = db_instance()
 
     def orders(self, query=None, cancel=False):
         pass
@@ -66,10 +65,9 @@ class AdministrationProvider(AdminProviderInterfaceV0):
 
     def error_to(self, orderid, state):
         order = Order.find(orderid)
-        err_scenes = order.scenes({'status': 'error'})
         try:
-            for scene in err_scenes:
-                scene.update('status', state)
+            Scene.update_where({'order_id': order.id, 'status': 'error'},
+                               {'status': state})
 
             if state == 'submitted':
                 order.status = 'ordered'
@@ -116,6 +114,8 @@ class AdministrationProvider(AdminProviderInterfaceV0):
             logger.critical("error updating system status: {}".format(e))
             return {'msg': "error updating database: {}".format(e.message)}
 
+        ConfigurationProvider.invalidate()
+
         return True
 
     @staticmethod
@@ -124,8 +124,8 @@ class AdministrationProvider(AdminProviderInterfaceV0):
 
     @staticmethod
     def admin_whitelist():
-        return api_cfg()['admin_whitelist']
+        return cfg_ip_list('admin_whitelist')
 
     @staticmethod
     def stat_whitelist():
-        return api_cfg()['stat_whitelist']
+        return cfg_ip_list('stat_whitelist')
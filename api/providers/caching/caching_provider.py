@@ -1,4 +1,9 @@
 import os
+import math
+import time
+import random
+import threading
+from collections import OrderedDict, Counter
 
 from api.providers.caching import CachingProviderInterfaceV0
 
@@ -9,34 +14,315 @@ class CachingProviderException(Exception):
     pass
 
 
+class LocalCache(object):
+    """
+    Bounded, per-process LRU tier kept in front of memcache
+
+    Entries are fresh for at most ttl seconds, after which they are only
+    served (stale) while memcache is unavailable, until their own expiry.
+    Values are shared between callers, so only providers whose values are
+    never modified should opt in
+    """
+
+    def __init__(self, maxsize=1000, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl  # seconds
+        # {key: (value, fresh until, expires at)}
+        self.entries = OrderedDict()
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key, stale=False):
+        """
+        :param key: cache key
+        :param stale: allow entries past their ttl, but not their expiry
+        :return: (True, value) if found, else (False, None)
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None and now < entry[2]:
+                self.entries[key] = entry
+                if now < entry[1]:
+                    self.counts['hits'] += 1
+                    return True, entry[0]
+                if stale:
+                    self.counts['stale_hits'] += 1
+                    return True, entry[0]
+            self.counts['misses'] += 1
+        return False, None
+
+    def put(self, key, value, expirey):
+        """
+        :param key: cache key
+        :param value: object to store
+        :param expirey: time in seconds until the entry may no longer be served
+        """
+        now = time.time()
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (value, now + min(self.ttl, expirey),
+                                 now + expirey)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def refresh(self, key, value):
+        """
+        Store a value read from memcache, whose remaining lifetime is unknown.
+        It keeps the expiry of an entry this process set, otherwise it is
+        served for no longer than ttl
+
+        :param key: cache key
+        :param value: object read
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            expires = now + self.ttl
+            if entry is not None and now < entry[2]:
+                expires = entry[2]
+            self.entries[key] = (value, min(now + self.ttl, expires), expires)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            out = dict(self.counts)
+            out['size'] = len(self.entries)
+        return out
+
+
+local_cache = LocalCache(maxsize=int(os.getenv('ESPA_LOCAL_CACHE_SIZE', 1000)),
+                         ttl=int(os.getenv('ESPA_LOCAL_CACHE_TTL', 30)))
+
+
 class CachingProvider(CachingProviderInterfaceV0):
 
-    def __init__(self, memcache_hosts=None, timeout=600, debug=0):
+    # memcache tier counters, shared by every provider in the process
+    counts = Counter()
+    counts_lock = threading.Lock()
+
+    # get_or_compute bookkeeping, which must always come from memcache
+    memcache_only = ('.meta', '.lease')
+
+    # {cache key: lock} serializing get_or_compute fills within the process
+    fill_locks = dict()
+    fill_locks_lock = threading.Lock()
+
+    def __init__(self, memcache_hosts=None, timeout=600, debug=0, local=False):
+        """
+        :param memcache_hosts: list of host:port strings
+        :param timeout: default expiry in seconds
+        :param debug: memcache client debug level
+        :param local: keep the process' local tier in front of memcache, for
+                      read-only values; disabled for every provider when
+                      its ttl is 0
+        """
         if not memcache_hosts:
             memcache_hosts = os.getenv('ESPA_MEMCACHE_HOST', '127.0.0.1:11211').split(',')
         self.cache = memcache.Client(memcache_hosts, debug=debug)
         self.timeout = timeout # seconds
+        self.local = local_cache if local and local_cache.ttl > 0 else None
+
+    def _local(self, cache_key):
+        """
+        :return: True if the key is kept in the local tier
+        """
+        return self.local is not None and not cache_key.endswith(self.memcache_only)
+
+    def _count(self, name, inc=1):
+        with self.counts_lock:
+            self.counts[name] += inc
+
+    def available(self):
+        """
+        The memcache client marks a server dead for a retry period after
+        a failed connection
+
+        :return: True if any memcache server is usable
+        """
+        now = time.time()
+        return any(getattr(s, 'deaduntil', 0) <= now for s in self.cache.servers)
 
     def get(self, cache_key):
-        return self.cache.get(cache_key)
+        local = self._local(cache_key)
+        if local:
+            found, value = self.local.get(cache_key)
+            if found:
+                return value
+
+        value = self.cache.get(cache_key)
+        if value is not None:
+            self._count('hits')
+            if local:
+                self.local.refresh(cache_key, value)
+            return value
+
+        if not self.available():
+            # degraded, keep serving what this process already has
+            self._count('errors')
+            if local:
+                return self.local.get(cache_key, stale=True)[1]
+            return None
+
+        self._count('misses')
+        return None
 
     def set(self, cache_key, value, expirey=None):
         timeout = expirey or self.timeout
+        if self._local(cache_key):
+            self.local.put(cache_key, value, timeout)
         success = self.cache.set(cache_key, value, timeout)
         if not success:
+            self._count('errors')
             return False
         return True
 
     def get_multi(self, cache_keys):
         if not isinstance(cache_keys, list):
             raise TypeError('Cached get multiple keys must list keys')
-        return self.cache.get_multi(cache_keys)
+
+        resp = dict()
+        missing = list()
+        for key in cache_keys:
+            found, value = False, None
+            if self._local(key):
+                found, value = self.local.get(key)
+            if found:
+                resp[key] = value
+            else:
+                missing.append(key)
+        if not missing:
+            return resp
+
+        fetched = self.cache.get_multi(missing)
+        self._count('hits', len(fetched))
+        for key, value in fetched.items():
+            if self._local(key):
+                self.local.refresh(key, value)
+        resp.update(fetched)
+
+        if len(fetched) < len(missing):
+            if not self.available():
+                self._count('errors')
+                for key in set(missing) - set(fetched):
+                    if self._local(key):
+                        found, value = self.local.get(key, stale=True)
+                        if found:
+                            resp[key] = value
+            else:
+                self._count('misses', len(missing) - len(fetched))
+        return resp
 
     def set_multi(self, cache_dict, expirey=None):
         timeout = expirey or self.timeout
         if not isinstance(cache_dict, dict):
             raise TypeError('Cache set multiple must be dict (key/value) pairs')
+        for key, value in cache_dict.items():
+            if self._local(key):
+                self.local.put(key, value, timeout)
         failures = self.cache.set_multi(cache_dict, timeout)
         if failures:
+            self._count('errors')
             return False
         return True
+
+    def _fill_lock(self, cache_key):
+        with self.fill_locks_lock:
+            return self.fill_locks.setdefault(cache_key, threading.Lock())
+
+    def _lookup(self, cache_key):
+        """
+        :return: value, (expires at, seconds taken to compute) or None
+        """
+        found = self.get_multi([cache_key, cache_key + '.meta'])
+        return found.get(cache_key), found.get(cache_key + '.meta')
+
+    @staticmethod
+    def _fresh(value, meta, beta):
+        """
+        Probabilistic early expiration: the closer to expiry, and the longer
+        the value took to compute, the more likely a caller is to refresh it
+        """
+        if value is None:
+            return False
+        if meta is None:
+            # stored by a plain set()
+            return True
+        expires, delta = meta
+        return time.time() - delta * beta * math.log(1 - random.random()) < expires
+
+    def _compute(self, cache_key, compute, timeout, lease):
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        self._count('computes')
+        # kept past its expiry, while the next fill is in progress
+        self.set_multi({cache_key: value,
+                        cache_key + '.meta': (start + timeout, delta)},
+                       timeout + lease)
+        return value
+
+    def get_or_compute(self, cache_key, compute, expirey=None, lease=30,
+                       wait=5, beta=1.0):
+        """
+        Retrieve an item from the cache, computing and storing it on a miss
+
+        Only one caller across all processes computes the value at a time,
+        holding a memcache add() lease. The others serve the expired value,
+        or if there is none, wait for the lease holder to store it
+
+        :param cache_key: identifying key to the stored object
+        :param compute: callable with no arguments producing the value
+        :param expirey: time in seconds the value is considered fresh
+        :param lease: time in seconds a fill may hold the lease, and an
+                      expired value may still be served
+        :param wait: time in seconds to wait for another caller's fill
+                     before computing regardless
+        :param beta: early refresh eagerness, 0 disables it
+        :return: object
+        """
+        timeout = expirey or self.timeout
+        value, meta = self._lookup(cache_key)
+        if self._fresh(value, meta, beta):
+            return value
+
+        with self._fill_lock(cache_key):
+            # another thread may have filled it while this one waited
+            value, meta = self._lookup(cache_key)
+            if self._fresh(value, meta, beta):
+                return value
+
+            lease_key = cache_key + '.lease'
+            if self.cache.add(lease_key, os.getpid(), lease) or not self.available():
+                try:
+                    return self._compute(cache_key, compute, timeout, lease)
+                finally:
+                    self.cache.delete(lease_key)
+
+            if value is not None:
+                self._count('stale')
+                return value
+
+            deadline = time.time() + wait
+            while time.time() < deadline:
+                time.sleep(0.1)
+                value = self.get(cache_key)
+                if value is not None:
+                    return value
+
+            return self._compute(cache_key, compute, timeout, lease)
+
+    def stats(self):
+        """
+        Hit and miss counters for this process
+
+        :return: {'local': {...}, 'memcache': {...}}
+        """
+        with self.counts_lock:
+            remote = dict(self.counts)
+        return {'local': local_cache.stats(), 'memcache': remote}
@@ -1,17 +1,37 @@
 import os
+import time
+import uuid
 import datetime
+import threading
 import yaml
 
 from api.util.dbconnect import db_instance
 from api.providers.configuration import ConfigurationProviderInterfaceV0
+from api.providers.caching.caching_provider import CachingProvider
 from api.util import api_cfg
 
+cache = CachingProvider()
+
 
 class ConfigurationProviderException(Exception):
     pass
 
 
 class ConfigurationProvider(ConfigurationProviderInterfaceV0):
+    # Process-local snapshots of the ordering_configuration table, keyed
+    # on the testing schema flag so test runs never see ops values
+    # {scope: {'config': dict, 'version': str, 'loaded': float,
+    #          'checked': float}}
+    _snapshots = {}
+    _snapshot_lock = threading.Lock()
+
+    # memcache key bumped on every write, signalling other workers
+    version_key = 'ordering_configuration.version'
+
+    # seconds before a snapshot is re-read no matter what
+    config_cache_ttl = 300
+    # seconds between checks of the shared version key
+    config_cache_check = 5
 
     def __init__(self):
         # fetch vars set in api_cfg['config']
@@ -32,16 +52,16 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
 
     @property
     def configuration_keys(self):
-        return self._retrieve_config()
+        return dict(self._cached_config())
 
     def url_for(self, service_name):
         key = "url.{0}.{1}".format(self.mode, service_name)
-        current = self._retrieve_config()
+        current = self._cached_config()
 
         return current.get(key)
 
     def get(self, key):
-        current = self._retrieve_config()
+        current = self._cached_config()
 
         if isinstance(key, (list, tuple)):
             ret = [current.get(k) for k in key]
@@ -72,6 +92,8 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
             db.execute(query, (key, value, value))
             db.commit()
 
+        self.invalidate()
+
         return {key: self.get(key)}
 
     def delete(self, key):
@@ -84,10 +106,12 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
                 db.execute(query, (key,))
                 db.commit()
 
+            self.invalidate()
+
         return self.get(key)
 
     def exists(self, key):
-        current = self._retrieve_config()
+        current = self._cached_config()
 
         if key in current:
             return True
@@ -111,6 +135,8 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
             db.execute(sql)
             db.commit()
 
+        self.invalidate()
+
     def dump(self, path=None):
         ts = datetime.datetime.now().strftime('config-%m%d%y-%H%M%S')
 
@@ -167,6 +193,50 @@ class ConfigurationProvider(ConfigurationProviderInterfaceV0):
             raise ConfigurationProviderException("{} as defined by explorer_yaml in "
                                                  ".cfgnfo not found".format(self.explorer_yaml))
 
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop this process's configuration snapshots, and signal other
+        processes to drop theirs by changing the shared version key
+        """
+        with cls._snapshot_lock:
+            cls._snapshots = {}
+
+        cache.set(cls.version_key, uuid.uuid4().hex, 60 * 60 * 24)
+
+    def _cached_config(self):
+        """
+        Retrieve the configuration from the process-local snapshot,
+        re-reading the table once the snapshot has expired or the shared
+        version key shows another process has changed it
+
+        :return: dict
+        """
+        scope = os.getenv('espa_api_testing')
+        now = time.time()
+        snap = self._snapshots.get(scope)
+
+        if snap and now - snap['loaded'] < int(self.config_cache_ttl):
+            if now - snap['checked'] < int(self.config_cache_check):
+                return snap['config']
+
+            version = cache.get(self.version_key)
+            if version == snap['version']:
+                snap['checked'] = now
+                return snap['config']
+        else:
+            version = cache.get(self.version_key)
+
+        config = self._retrieve_config()
+
+        with self._snapshot_lock:
+            self._snapshots[scope] = {'config': config,
+                                      'version': version,
+                                      'loaded': now,
+                                      'checked': now}
+
+        return config
+
     @staticmethod
     def _retrieve_config():
         config = {}
@@ -195,10 +195,10 @@ class OrderingProvider(ProviderInterfaceV0):
                     .format(orderid, request_ip_address))
         killable_scene_states = ('submitted', 'oncache', 'onorder', 'queued',
                                  'retry', 'error', 'unavailable', 'complete')
-        scenes = order.scenes(sql_dict={'status': killable_scene_states})
-        if len(scenes) > 0:
-            Scene.bulk_update([s.id for s in scenes], Scene.cancel_opts())
-        else:
+        scene_ids = Scene.update_where({'order_id': order.id,
+                                        'status': killable_scene_states},
+                                       Scene.cancel_opts())
+        if not scene_ids:
             logger.info('No scenes to cancel for order {}'
                         .format(orderid, request_ip_address))
 
@@ -233,7 +233,7 @@ class OrderingProvider(ProviderInterfaceV0):
 
         response = dict()
         for order in orders:
-            response[order.orderid] = order.scenes(search)
+            response[order.orderid] = order.scenes(search, eager=True)
         return response
 
     def get_system_status(self):
@@ -1,6 +1,7 @@
 from api.domain import sensor
 from api.domain.scene import Scene, SceneException
 from api.domain.order import Order, OptionsConversion, OrderException
+from api.domain.ee_status import EEStatusUpdate, EEStatusUpdateException
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.util.dbconnect import DBConnectException, db_instance
 from api.providers.production import ProductionProviderInterfaceV0
@@ -11,6 +12,7 @@ from api.notification import emails
 from api.domain.user import User
 from api import util as utils
 
+import collections
 import copy
 import datetime
 import urllib
@@ -88,10 +90,9 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :param log_file_contents: log file contents from processing
         :return: True
         """
-        order_status = Scene.get('ordering_order.status', name, orderid)
-
-        order_id = Scene.get('order_id', name, orderid)
-        order_source = Scene.get('order_source', name, orderid)
+        scene = Scene.get_context(name, orderid)
+        order_status = scene.order_attr('status')
+        order_source = scene.order_attr('order_source')
         base_url = config.url_for('distribution.cache')
 
         product_file = os.path.basename(completed_file_location)
@@ -102,8 +103,6 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         cksum_download_url = ('{}/orders/{}/{}'
                               .format(base_url, orderid, cksum_file))
 
-        scene = Scene.by_name_orderid(name, order_id)
-
         if order_status == 'cancelled':
             if os.path.exists(completed_file_location):
                 scene.download_size = os.path.getsize(completed_file_location)
@@ -133,20 +132,11 @@ class ProductionProvider(ProductionProviderInterfaceV0):
 
         if order_source == 'ee':
             # update EE
-            ee_order_id = Scene.get('ee_order_id', name, orderid)
-            ee_unit_id = Scene.get('ee_unit_id', name, orderid)
-            try:
-                lta.update_order_status(ee_order_id, ee_unit_id, 'C')
-            except Exception, e:
-                cache_key = 'lta.cannot.update'
-                lta_conn_failed_10mins = cache.get(cache_key)
-                if lta_conn_failed_10mins:
-                    logger.warn('Problem updating LTA order: {}'.format(e))
-                cache.set(cache_key, datetime.datetime.now())
+            if not self.queue_ee_updates([(scene, scene.order_attr('ee_order_id'), 'C')]):
                 scene.failed_lta_status_update = 'C'
 
         try:
-            scene.save()
+            scene.save(changed_only=True)
         except DBConnectException, e:
             message = "DBConnect Exception ordering_provider mark_product_complete scene: {0}"\
                         "\nmessage: {1}".format(scene, e.message)
@@ -166,33 +156,23 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :return: True
         """
 
-        order_id = Scene.get('order_id', name, orderid)
-        order_source = Scene.get('order_source', name, orderid)
+        scene = Scene.get_context(name, orderid)
+        order_source = scene.order_attr('order_source')
 
-        scene = Scene.by_name_orderid(name, order_id)
         scene.status = 'unavailable'
         scene.processing_location = processing_loc
         scene.completion_date = datetime.datetime.now()
         scene.log_file_contents = error
         scene.note = note
-        scene.save()
+        scene.save(changed_only=True)
 
         if order_source == 'ee':
             # update EE
-            ee_order_id = Scene.get('ee_order_id', name, orderid)
-            ee_unit_id = Scene.get('ee_unit_id', name, orderid)
-            try:
-                lta.update_order_status(ee_order_id, ee_unit_id, 'R')
-            except Exception, e:
-                cache_key = 'lta.cannot.update'
-                lta_conn_failed_10mins = cache.get(cache_key)
-                if lta_conn_failed_10mins:
-                    logger.warn('Problem updating LTA order: {}'.format(e))
-                cache.set(cache_key, datetime.datetime.now())
+            if not self.queue_ee_updates([(scene, scene.order_attr('ee_order_id'), 'R')]):
                 scene.failed_lta_status_update = 'R'
 
         try:
-            scene.save()
+            scene.save(changed_only=True)
         except DBConnectException, e:
             message = "DBConnect Exception ordering_provider set_product_unavailable " \
                       "scene: {0}\nmessage: {1}".format(scene, e.message)
@@ -214,15 +194,12 @@ class ProductionProvider(ProductionProviderInterfaceV0):
                               {'status': 'unavailable',
                                'completion_date': datetime.datetime.now(),
                                'note': reason})
-            for p in products:
-                if p.order_attr('order_source') == 'ee':
-                    try:
-                        lta.update_order_status(p.order_attr('ee_order_id'), p.ee_unit_id, 'R')
-                    except Exception, e:
-                        # perhaps this doesn't need to be elevated to 'debug' status
-                        # as its a fairly regular occurrence
-                        logger.warn('Problem updating LTA order: {}'.format(e))
-                        p.update('failed_lta_status_update', 'R')
+            Scene.prefetch_order_attrs(products, ('order_source', 'ee_order_id'))
+            ee_products = [p for p in products if p.order_attr('order_source') == 'ee']
+            updates = [(p, p.order_attr('ee_order_id'), 'R') for p in ee_products]
+            if updates and not ProductionProvider.queue_ee_updates(updates):
+                Scene.update_where({'id': [p.id for p in ee_products]},
+                                   {'failed_lta_status_update': 'R'})
         except Exception, e:
             raise ProductionProviderException(e)
 
@@ -246,7 +223,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             scene.processing_location = processing_loc
         if status:
             scene.status = status
-        scene.save()
+        scene.save(changed_only=True)
         log_str = "Scene status updated. order: {0}\n scene id/name: {1}/{2}\nstatus:{3}\nprocessing_location{4}\n "
         logger.info(log_str.format(order.orderid, scene.id, scene.name, scene.status, scene.processing_location))
         return True
@@ -334,7 +311,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         scene.log_file_contents = error
         scene.processing_location = processing_loc
         scene.note = note
-        scene.save()
+        scene.save(changed_only=True)
 
         return True
 
@@ -364,7 +341,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             if resolution.status == 'submitted':
                 product.status = 'submitted'
                 product.note = ''
-                product.save()
+                product.save(changed_only=True)
             elif resolution.status == 'unavailable':
                 self.set_product_unavailable(product.name,
                                              order.orderid,
@@ -387,12 +364,12 @@ class ProductionProvider(ProductionProviderInterfaceV0):
                     product.status = 'error'
                     product.processing_location = processing_loc
                     product.log_file_contents = error
-                    product.save()
+                    product.save(changed_only=True)
         else:
             product.status = 'error'
             product.processing_location = processing_loc
             product.log_file_contents = error
-            product.save()
+            product.save(changed_only=True)
 
         return True
 
@@ -418,13 +395,8 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         non_plot_ids = [r['name'] for r in query_results if r['sensor_type'] != 'plot']
 
         if non_plot_ids:
-            urls = dict()
             token = inventory.get_session()
-            for dataset, ids in inventory.split_by_dataset(non_plot_ids).items():
-                try:
-                    urls.update(inventory.download_urls(token, ids, dataset))
-                except Exception as e:
-                    logger.error('Problem getting URLs: {}'.format(e), exc_info=True)
+            urls = inventory.download_urls(token, non_plot_ids, partial=True)
             if encode_urls:
                 urls = {k: urllib.quote(u, '') for k, u in urls.items()}
 
@@ -678,13 +650,14 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :param order_id: order id used in the system
         """
         missing_scenes = []
+        updates = []
         scenes = Scene.where({'order_id': order_id,
                               'ee_unit_id': tuple([s['unit_num'] for s in ee_scenes])})
+        scenes = {so.ee_unit_id: so for so in scenes}
         for s in ee_scenes:
-            scene = [so for so in scenes if so.ee_unit_id == s['unit_num']]
+            scene = scenes.get(s['unit_num'])
 
             if scene:
-                scene = scene[0]
                 if scene.status == 'complete':
                     status = 'C'
                 elif scene.status in ('unavailable', 'cancelled'):
@@ -692,19 +665,15 @@ class ProductionProvider(ProductionProviderInterfaceV0):
                 else:
                     status = 'I'
                     continue  # No need to update scenes in progress
-                try:
-                    lta.update_order_status(eeorder, s['unit_num'], status)
-                except Exception, e:
-                    cache_key = 'lta.cannot.update'
-                    lta_conn_failed_10mins = cache.get(cache_key)
-                    if lta_conn_failed_10mins:
-                        logger.warn("Error updating lta for scene: {}\n{}".format(scene.id, e))
-                    cache.set(cache_key, datetime.datetime.now())
-                    scene.update('failed_lta_status_update', status)
+                updates.append((scene, eeorder, status))
             else:
                 # scene insertion was missed initially, add it now
                 missing_scenes.append(s)
 
+        if updates and not self.queue_ee_updates(updates):
+            for scene, _, status in updates:
+                scene.update('failed_lta_status_update', status)
+
         if missing_scenes:
             # There appear to be scenes in this order which we didn't receive the
             # first go around, try adding them now
@@ -716,11 +685,22 @@ class ProductionProvider(ProductionProviderInterfaceV0):
     def handle_retry_products(self, products):
         """
         Handle all products in retry status
+        :param products: list of Scene objects to resubmit
+        :return: True
+        """
+        if not products:
+            return True
+        return self.handle_retry_products_where({'id': [p.id for p in products]})
+
+    @staticmethod
+    def handle_retry_products_where(params):
+        """
+        Resubmit the products in retry status, in a single update
+        :param params: Scene.where parameters selecting the products
         :return: True
         """
         try:
-            if len(products) > 0:
-                Scene.bulk_update([p.id for p in products], {'status': 'submitted', 'note': ''})
+            Scene.update_where(params, {'status': 'submitted', 'note': ''})
         except Exception as e:
             raise ProductionProviderException("error with handle_retry_products: {}".format(e))
 
@@ -732,7 +712,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :return: True
         """
         for order in orders:
-            if len(order.scenes({'status': 'cancelled'})) != len(order.scenes()):
+            if Scene.query({'order_id': order.id, 'status !=': 'cancelled'}).exists():
                 logger.warning('Cancelled order %s has outstanding scenes', order.orderid)
                 continue
             if not order.completion_email_sent:
@@ -755,12 +735,13 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         product_tram_ids = set([product.tram_order_id for product in products])
         sorted_tram_ids = sorted(product_tram_ids)[:500]
 
-        rejected = []
-        available = []
+        rejected = set()
+        available = set()
 
-        # converting to a set eliminates duplicate calls to lta
-        for tid in sorted_tram_ids:
-            order_status = lta.get_order_status(tid)
+        # converting to a set eliminates duplicate calls to lta, orders
+        # which fail or time out are checked again on the next run
+        order_statuses = lta.get_order_statuses(sorted_tram_ids)
+        for order_status in order_statuses.values():
 
             # There are a variety of product statuses that come back from tram
             # on this call.  I is inprocess, Q is queued for the backend system,
@@ -768,11 +749,11 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             # all the statuses except for R and C because we don't care.
             # In the case of D (duplicates), when the first product completes, all
             # duplicates will also be marked C
-            for unit in order_status['units']:
+            for unit in order_status.get('units', []):
                 if unit['unit_status'] == 'R':
-                    rejected.append(unit['sceneid'])
+                    rejected.add(unit['sceneid'])
                 elif unit['unit_status'] == 'C':
-                    available.append(unit['sceneid'])
+                    available.add(unit['sceneid'])
 
         # Go find all the tram units that were rejected and mark them
         # unavailable in our database.  Note that we are not looking for
@@ -808,6 +789,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         """
         logger.info("Retrieving contact ids for submitted landsat products")
         if scenes:
+            Scene.prefetch_order_attrs(scenes, ('user_id',))
             user_ids = [s.order_attr('user_id') for s in scenes]
             users = User.where({'id': tuple(user_ids)})
             contact_ids = set([user.contactid for user in users])
@@ -824,8 +806,11 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         """
         logger.info("Updating landsat product status")
         user = User.by_contactid(contact_id)
-        product_list = Order.get_user_scenes(user.id, {'sensor_type': 'landsat','status': 'submitted'})
-        product_list = sorted(product_list, key=lambda x: x.id)[:500]
+        order_ids = Order.query({'user_id': user.id}).values_list('id')
+        product_list = list()
+        if order_ids:
+            product_list = Scene.query({'order_id': order_ids, 'sensor_type': 'landsat', 'status': 'submitted'})\
+                                .order_by('id').limit(500).all()
         logger.info("Ordering {0} scenes for contact:{1}".format(len(product_list), contact_id))
 
         product_list = self.check_dependencies_for_products(product_list)
@@ -858,6 +843,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
             'st': config.url_for('modis.datapool')  # ST requires ASTER GED
         }
         passed_dep_check = list()
+        Scene.prefetch_order_attrs(scene_list, ('product_opts',))
         for s in scene_list:
             opts = s.order_attr('product_opts')
             sn = sensor.instance(s.name).shortname
@@ -1017,16 +1003,17 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         see the download and retrieve its size
         :return: True
         """
+        updates = list()
         for scene in scenes:
             if os.path.exists(scene.product_distro_location):
-                scene.update('download_size', os.path.getsize(scene.product_distro_location))
+                updates.append((scene.id, {'download_size': os.path.getsize(scene.product_distro_location)}))
             else:
-                scene.status = 'error'
-                scene.note = 'product download not found'
-                scene.save()
+                updates.append((scene.id, {'status': 'error', 'note': 'product download not found'}))
                 logger.critical("scene download size re-calcing failed, {}"
                                 .format(scene.product_distro_location))
 
+        Scene.bulk_update_rows(updates)
+
         return True
 
     def finalize_orders(self, orders):
@@ -1054,20 +1041,22 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         logger.info('Purging {0} orders from the active record.'.format(len(orders)))
         logger.info('Starting cache capacity:{0}'.format(start_capacity))
 
+        product_counts = collections.Counter()
+        if orders:
+            order_ids = [o.id for o in orders]
+            Order.update_where({'id': order_ids}, {'status': 'purged'})
+            product_counts.update(Scene.update_where({'order_id': order_ids},
+                                                     {'status': 'purged',
+                                                      'log_file_contents': '',
+                                                      'product_distro_location': '',
+                                                      'product_dload_url': '',
+                                                      'cksum_distro_location': '',
+                                                      'cksum_download_url': '',
+                                                      'job_name': ''},
+                                                     returning='order_id'))
+
         for order in orders:
             try:
-                #with transaction.atomic():
-                order.update('status', 'purged')
-                for product in order.scenes():
-                    product.status = 'purged'
-                    product.log_file_contents = ''
-                    product.product_distro_location = ''
-                    product.product_dload_url = ''
-                    product.cksum_distro_location = ''
-                    product.cksum_download_url = ''
-                    product.job_name = ''
-                    product.save()
-
                 if onlinecache.exists(order.orderid):
                     # bulk update product status, delete unnecessary field data
                     logger.info('Deleting {0} from online cache disk'.format(order.orderid))
@@ -1080,30 +1069,95 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         end_capacity = onlinecache.capacity()
         logger.info('Ending cache capacity:{0}'.format(end_capacity))
 
-        orders = [{o.orderid: len(o.scenes())} for o in orders]
+        orders = [{o.orderid: product_counts[o.id]} for o in orders]
         if send_email is True:
             logger.info('Sending purge report')
             emails.send_purge_report(start_capacity, end_capacity, orders)
 
         return True
 
+    @staticmethod
+    def queue_ee_updates(updates):
+        """
+        Record EE unit status changes in the outbox, they are sent to LTA
+        by deliver_ee_updates
+
+        :param updates: list of (Scene, ee order id, status)
+        :return: True if queued, False if the outbox could not be written
+        """
+        queued = []
+        for s, ee_order_id, status in updates:
+            if ee_order_id and s.ee_unit_id is not None:
+                queued.append((s.id, ee_order_id, s.ee_unit_id, status))
+            else:
+                logger.warn('Scene {} has no EE order unit, status {} not '
+                            'sent'.format(s.id, status))
+        try:
+            EEStatusUpdate.enqueue(queued)
+        except EEStatusUpdateException, e:
+            logger.warn('Could not queue EE status updates: {}'.format(e))
+            return False
+        return True
+
+    @staticmethod
+    def deliver_ee_updates(limit=1000):
+        """
+        Send queued EE status updates to LTA, concurrently across EE orders.
+        Updates LTA did not accept are retried later, backing off on each
+        failure
+
+        :param limit: most updates to send
+        :return: True
+        """
+        pending = EEStatusUpdate.claim(limit)
+        if not pending:
+            return True
+
+        results = lta.update_order_statuses([(u['ee_order_id'], u['ee_unit_id'], u['status'])
+                                             for u in pending])
+        delivered = []
+        failed = collections.defaultdict(list)
+        for u in pending:
+            error = results.get((u['ee_order_id'], u['ee_unit_id']))
+            if error is None:
+                delivered.append(u['id'])
+            else:
+                failed[error].append(u['id'])
+
+        logger.info('Delivered {} of {} EE status updates'
+                    .format(len(delivered), len(pending)))
+        EEStatusUpdate.mark_delivered(delivered)
+        for error, ids in failed.items():
+            # LTA could still be unavailable, log and it'll be tried again later
+            logger.warn('EE status update failed for {} units: {}'
+                        .format(len(ids), error))
+            EEStatusUpdate.mark_failed(ids, error)
+        return True
+
     @staticmethod
     def handle_failed_ee_updates(scenes):
+        """
+        Move status updates left on scenes, when the outbox could not be
+        written, into the outbox
+
+        :param scenes: list of Scene objects with failed_lta_status_update
+        :return: True
+        """
         n_failed = len(scenes)
-        if n_failed:
-            logger.critical('Failed LTA status count: {} scenes'.format(n_failed))
-        for s in scenes:
+        if not n_failed:
+            return True
+
+        logger.critical('Failed LTA status count: {} scenes'.format(n_failed))
+        Scene.prefetch_order_attrs(scenes, ('ee_order_id',))
+        updates = [(s, s.order_attr('ee_order_id'), s.failed_lta_status_update)
+                   for s in scenes]
+        if ProductionProvider.queue_ee_updates(updates):
             try:
-                lta.update_order_status(s.order_attr('ee_order_id'), s.ee_unit_id,
-                                        s.failed_lta_status_update)
-                s.update('failed_lta_status_update', None)
-            except DBConnectException, e:
+                Scene.update_where({'id': [s.id for s in scenes]},
+                                   {'failed_lta_status_update': None})
+            except SceneException, e:
                 raise ProductionProviderException('ordering_scene update failed for '
                                                   'handle_failed_ee_updates: {}'.format(e))
-            except Exception, e:
-                # LTA could still be unavailable, log and it'll be tried again later
-                logger.warn('Failed EE update retry failed again for '
-                            'scene {}\n{}'.format(s.id, e))
         return True
 
     def handle_stuck_jobs(self, scenes):
@@ -1116,12 +1170,10 @@ class ProductionProvider(ProductionProviderInterfaceV0):
 
         sids = [int(s.id) for s in scenes]
         self.catch_orphaned_scenes()
-        scenes = Scene.where({'id': sids})
 
-        orphaned_scenes = [s for s in scenes if s.orphaned]
-        if len(orphaned_scenes):
-            logger.warning('Found {N} orphaned products, retrying...'.format(N=len(orphaned_scenes)))
-            Scene.bulk_update([s.id for s in orphaned_scenes], {'status': 'submitted'})
+        orphaned_ids = Scene.update_where({'id': sids, 'orphaned': True}, {'status': 'submitted'})
+        if len(orphaned_ids):
+            logger.warning('Found {N} orphaned products, retrying...'.format(N=len(orphaned_ids)))
         return True
 
     def handle_orders(self, username=None):
@@ -1148,7 +1200,8 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         orders = Order.where({'id': pending_orders, 'initial_email_sent IS': None})
         self.send_initial_emails(orders)
 
-        products = Scene.where({'status': 'onorder', 'tram_order_id IS NOT': None, 'order_id': pending_orders})
+        products = Scene.where({'status': 'onorder', 'tram_order_id IS NOT': None, 'order_id': pending_orders},
+                               prefetch=('order_source', 'ee_order_id'))
         self.handle_onorder_landsat_products(products)
 
         time_jobs_stuck = datetime.datetime.now() - datetime.timedelta(hours=6) # not expected to change
@@ -1156,11 +1209,12 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         self.handle_stuck_jobs(products)
 
         now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-        products = Scene.where({'status': 'retry', 'retry_after <': now, 'order_id': pending_orders})
-        self.handle_retry_products(products)
+        self.handle_retry_products_where({'status': 'retry', 'retry_after <': now, 'order_id': pending_orders})
 
-        scenes = Scene.where({'failed_lta_status_update IS NOT': None, 'order_id': pending_orders})
+        scenes = Scene.where({'failed_lta_status_update IS NOT': None, 'order_id': pending_orders},
+                             prefetch=('ee_order_id',))
         self.handle_failed_ee_updates(scenes)
+        self.deliver_ee_updates()
 
         search = {'status': 'cancelled',  'completion_email_sent IS': None}
         if user:
@@ -1168,7 +1222,8 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         orders = Order.where(search)
         self.handle_cancelled_orders(orders)
 
-        scenes = Scene.where({'status': 'submitted', 'sensor_type': 'landsat', 'order_id': pending_orders})[:500]
+        scenes = Scene.query({'status': 'submitted', 'sensor_type': 'landsat', 'order_id': pending_orders},
+                             prefetch=('user_id',)).order_by('id').limit(500).all()
         self.handle_submitted_landsat_products(scenes)
 
         scenes = Scene.where({'status': 'submitted', 'sensor_type': 'modis', 'order_id': pending_orders})
@@ -1221,21 +1276,19 @@ class ProductionProvider(ProductionProviderInterfaceV0):
 
     @staticmethod
     def production_whitelist():
-        cache_key = 'prod_whitelist'
-        prodlist = cache.get(cache_key)
-        if prodlist is None:
+        def regenerate():
             logger.info("Regenerating production whitelist...")
-            # timeout in 6 hours
-            timeout = 60 * 60 * 6
             prodlist = list(['127.0.0.1', socket.gethostbyname(socket.gethostname())])
             try:
                 prodlist.append(hadoop_handler.master_ip())
                 prodlist.extend(hadoop_handler.slave_ips())
             except BaseException, e:
                 logger.exception('Could not access hadoop!')
-            cache.set(cache_key, prodlist, timeout)
+            return prodlist
 
-        return prodlist
+        # timeout in 6 hours
+        timeout = 60 * 60 * 6
+        return cache.get_or_compute('prod_whitelist', regenerate, timeout)
 
     @staticmethod
     def catch_orphaned_scenes():
@@ -1243,9 +1296,10 @@ class ProductionProvider(ProductionProviderInterfaceV0):
 
         def find_orphans():
             job_dict = hadoop_handler.job_names_ids()
-            queued_scenes = Scene.where({'status': ('queued', 'processing')})
-            return [scene for scene in queued_scenes if scene.job_name not in job_dict]
+            queued_scenes = Scene.iter_where({'status': ('queued', 'processing')})
+            return (scene for scene in queued_scenes if scene.job_name not in job_dict)
 
+        updates = list()
         for scene in find_orphans():
             if not scene.orphaned:
                 # scenes already marked orphaned can be ignored here
@@ -1253,12 +1307,12 @@ class ProductionProvider(ProductionProviderInterfaceV0):
                     # has enough time lapsed to confidently mark it orphaned?
                     d_time = o_time - scene.reported_orphan
                     if (d_time.seconds / 60) > 10:
-                        scene.orphaned = True
+                        updates.append((scene.id, {'orphaned': True}))
                 else:
                     # the scenes been newly reported an orphan, note the time
-                    scene.reported_orphan = o_time
+                    updates.append((scene.id, {'reported_orphan': o_time}))
 
-                scene.save()
+        Scene.bulk_update_rows(updates)
 
         return True
 
@@ -1272,12 +1326,8 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         :return: bool
         """
         updates = {'reported_orphan': None, 'orphaned': None}
-        scenes = Scene.where({'reported_orphan is not': None})
-        if len(scenes):
-            Scene.bulk_update([s.id for s in scenes], updates)
-        scenes = Scene.where({'orphaned is not': None})
-        if len(scenes):
-            Scene.bulk_update([s.id for s in scenes], updates)
+        Scene.update_where({'reported_orphan is not': None}, updates)
+        Scene.update_where({'orphaned is not': None}, updates)
 
         seconds = 630  # 10.5 minutes separation
         assert(self.catch_orphaned_scenes())
@@ -1285,12 +1335,11 @@ class ProductionProvider(ProductionProviderInterfaceV0):
         time.sleep(seconds)
         assert(self.catch_orphaned_scenes())
 
-        scenes = Scene.where({'orphaned': True,
-                              'status': ('queued', 'processing')})
         updates.update(status='submitted')
-        if len(scenes):
-            Scene.bulk_update([s.id for s in scenes], updates)
-        logger.info('Re-submitted {} orphaned scenes'.format(len(scenes)))
+        scene_ids = Scene.update_where({'orphaned': True,
+                                        'status': ('queued', 'processing')},
+                                       updates)
+        logger.info('Re-submitted {} orphaned scenes'.format(len(scene_ids)))
 
         return True
 
@@ -1301,10 +1350,7 @@ class ProductionProvider(ProductionProviderInterfaceV0):
 
         :return: bool
         """
-        scenes = Scene.where({'status': ('queued', 'processing')})
-        if scenes:
-            Scene.bulk_update([s.id for s in scenes], {'status': 'submitted'})
-            return True
-        else:
-            return False
+        scene_ids = Scene.update_where({'status': ('queued', 'processing')},
+                                       {'status': 'submitted'})
+        return bool(scene_ids)
 
@@ -21,7 +21,7 @@ from flask.ext.restful import Resource
 
 espa = APIv1()
 auth = HTTPBasicAuth()
-cache = CachingProvider()
+cache = CachingProvider(local=True)
 
 
 def user_ip_address():
@@ -109,22 +109,24 @@ def verify_user(username, password):
         cache_key = '{}-credentials'.format(username.replace(' ', '_espa_cred_insert_'))
         cache_entry = cache.get(cache_key)
 
-        if cache_entry:
-            # Need to be encrypted?
-            if cache_entry['password'] == password:
-                user_entry = cache_entry['user_entry']
-
-            # User may have changed their password while it was still cached
-            else:
-                user_entry = User.get(username, password)
+        # Need to be encrypted?
+        # User may have changed their password while it was still cached
+        if cache_entry and cache_entry['password'] == password:
+            user_entry = cache_entry['user_entry']
+            seen = cache_entry.get('seen')
         else:
             user_entry = User.get(username, password)
+            seen = None
 
-        cache_entry = {'password': password,
-                       'user_entry': user_entry}
-        cache.set(cache_key, cache_entry, 7200)
+        # auth_user is only written when the last login record is stale,
+        # otherwise the user id and roles come from the cached entry
+        user, login_seen = User.from_login(user_entry, seen)
+        if login_seen != seen:
+            cache_entry = {'password': password,
+                           'user_entry': user_entry,
+                           'seen': login_seen}
+            cache.set(cache_key, cache_entry, 7200)
 
-        user = User(*user_entry)
         if not user.is_staff:
             return False
         flask.g.user = user  # Replace usage with cached version
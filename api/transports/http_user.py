@@ -7,7 +7,7 @@ import memcache
 from api.interfaces.ordering.version1 import API as APIv1
 from api.domain import user_api_operations
 from api.system.logger import ilogger as logger
-from api.util import api_cfg
+from api.util import cfg_ip_list
 from api.util import lowercase_all
 from api.domain.user import User, UserException
 from api.external.ers import (
@@ -32,7 +32,8 @@ from functools import wraps
 
 espa = APIv1()
 auth = HTTPBasicAuth()
-cache = CachingProvider()
+# credential entries are never modified, keep them in the local tier too
+cache = CachingProvider(local=True)
 
 
 def user_ip_address():
@@ -60,17 +61,17 @@ def greylist(func):
     """
     @wraps(func)
     def decorated(*args, **kwargs):
-        black_ls = api_cfg().get('user_blacklist')
-        white_ls = api_cfg().get('user_whitelist')
+        black_ls = cfg_ip_list('user_blacklist')
+        white_ls = cfg_ip_list('user_whitelist')
         remote_addr = user_ip_address()
         # prohibited ip's
         if black_ls:
-            if remote_addr in black_ls.split(','):
+            if remote_addr in black_ls:
                 return AccessDeniedResponse()
 
         # for when were guarding access
         if white_ls:
-            if remote_addr not in white_ls.split(','):
+            if remote_addr not in white_ls:
                 return AccessDeniedResponse()
 
         return func(*args, **kwargs)
@@ -120,22 +121,24 @@ def verify_user(username, password):
         cache_key = '{}-credentials'.format(username.replace(' ', '_espa_cred_insert_'))
         cache_entry = cache.get(cache_key)
 
-        if cache_entry:
-            # Need to be encrypted?
-            if cache_entry['password'] == password:
-                user_entry = cache_entry['user_entry']
-
-            # User may have changed their password while it was still cached
-            else:
-                user_entry = User.get(username, password)
+        # Need to be encrypted?
+        # User may have changed their password while it was still cached
+        if cache_entry and cache_entry['password'] == password:
+            user_entry = cache_entry['user_entry']
+            seen = cache_entry.get('seen')
         else:
             user_entry = User.get(username, password)
+            seen = None
 
-        cache_entry = {'password': password,
-                       'user_entry': user_entry}
-        cache.set(cache_key, cache_entry, 7200)
+        # auth_user is only written when the last login record is stale,
+        # otherwise the user id and roles come from the cached entry
+        user, login_seen = User.from_login(user_entry, seen)
+        if login_seen != seen:
+            cache_entry = {'password': password,
+                           'user_entry': user_entry,
+                           'seen': login_seen}
+            cache.set(cache_key, cache_entry, 7200)
 
-        user = User(*user_entry)
         flask.g.user = user  # Replace usage with cached version
     except UserException as e:
         logger.info('Invalid login attempt, username: {}, {}'.format(username, e))
@@ -2,16 +2,83 @@ import smtplib
 from email.mime.text import MIMEText
 import ConfigParser
 import os
+import socket
+import struct
 import subprocess
 import datetime
+import threading
 
 import connections
 
+# Parsed .cfgnfo files, keyed on path
+# {path: {'mtime': float, 'cfg': dict, 'ip_lists': dict}}
+_cfg_cache = {}
+_cfg_lock = threading.Lock()
 
-def get_cfg(cfgfile=None):
+
+class IPList(object):
     """
-    Retrieve the configuration information from the .cfgnfo file
-    located in the current user's home directory
+    Pre-compiled, comma separated list of IP addresses and IPv4 CIDR
+    networks, used for black and white listing hosts
+
+    >>> ips = IPList('127.0.0.1, 10.0.0.0/8')
+    >>> assert('10.1.2.3' in ips)
+    >>> assert('127.0.0.2' not in ips)
+    """
+    def __init__(self, value=None):
+        self.addresses = set()
+        self.networks = []
+
+        for item in (value or '').split(','):
+            item = item.strip()
+            if not item:
+                continue
+
+            if '/' in item:
+                try:
+                    addr, bits = item.split('/')
+                    mask = (0xffffffff << (32 - int(bits))) & 0xffffffff
+                    self.networks.append((self.ipv4_int(addr) & mask, mask))
+                    continue
+                except (ValueError, socket.error):
+                    pass
+
+            self.addresses.add(item)
+
+    @staticmethod
+    def ipv4_int(addr):
+        return struct.unpack('!I', socket.inet_aton(addr))[0]
+
+    def __contains__(self, addr):
+        if addr in self.addresses:
+            return True
+
+        if self.networks:
+            try:
+                ip = self.ipv4_int(addr)
+            except (TypeError, socket.error):
+                return False
+
+            for net, mask in self.networks:
+                if ip & mask == net:
+                    return True
+
+        return False
+
+    def __nonzero__(self):
+        return bool(self.addresses or self.networks)
+
+    def __repr__(self):
+        nets = ['{}/{}'.format(socket.inet_ntoa(struct.pack('!I', net)),
+                               bin(mask).count('1'))
+                for net, mask in self.networks]
+        return 'IPList({})'.format(','.join(sorted(self.addresses) + nets))
+
+
+def _cfg_entry(cfgfile=None):
+    """
+    Retrieve the cache entry for the configuration file, re-parsing it
+    only when the file's modification time has changed
 
     :return: dict
     """
@@ -20,6 +87,15 @@ def get_cfg(cfgfile=None):
     else:
         cfg_path = cfgfile
 
+    try:
+        mtime = os.path.getmtime(cfg_path)
+    except OSError:
+        mtime = None
+
+    entry = _cfg_cache.get(cfg_path)
+    if entry is not None and entry['mtime'] == mtime:
+        return entry
+
     cfg_info = {}
     config = ConfigParser.ConfigParser()
     config.read(cfg_path)
@@ -29,14 +105,55 @@ def get_cfg(cfgfile=None):
         for opt in config.options(sect):
             cfg_info[sect][opt] = config.get(sect, opt)
 
-    return cfg_info
+    entry = {'mtime': mtime, 'cfg': cfg_info, 'ip_lists': {}}
+    with _cfg_lock:
+        _cfg_cache[cfg_path] = entry
+
+    return entry
+
+
+def reload_cfg():
+    """
+    Forget all parsed configuration files, forcing them to be
+    read again on next access
+    """
+    with _cfg_lock:
+        _cfg_cache.clear()
+
+
+def get_cfg(cfgfile=None):
+    """
+    Retrieve the configuration information from the .cfgnfo file
+    located in the current user's home directory
+
+    :return: dict
+    """
+    return _cfg_entry(cfgfile)['cfg']
 
 
 def api_cfg(section='config', cfgfile=None):
-    config = get_cfg(cfgfile)[section]
+    config = dict(get_cfg(cfgfile)[section])
     return config
 
 
+def cfg_ip_list(key, section='config', cfgfile=None):
+    """
+    Retrieve a comma separated list of hosts from the configuration file,
+    compiled once per file load
+
+    :param key: option name, such as 'user_blacklist'
+    :return: IPList
+    """
+    entry = _cfg_entry(cfgfile)
+    ip_lists = entry['ip_lists']
+
+    if (section, key) not in ip_lists:
+        value = entry['cfg'].get(section, {}).get(key)
+        ip_lists[(section, key)] = IPList(value)
+
+    return ip_lists[(section, key)]
+
+
 def send_email(sender, recipient, subject, body):
     """
     Send out an email to give notice of success or failure
@@ -1,4 +1,92 @@
+import os
+import inspect
+import threading
+
+from multiprocessing.pool import ThreadPool
+
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+# (connect, read) seconds, applied to requests made through http_session()
+TIMEOUT = (5, 300)
+
+_sessions = {}
+_sessions_pid = None
+_sessions_lock = threading.Lock()
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def _retry(retries):
+    """
+    urllib3 before 1.15 (bundled with requests < 2.10) raises once status
+    retries run out, rather than returning the last response. There, only
+    connection failures are retried, so callers still see the bad status
+
+    :param retries: number of retries for failed requests
+    :return: Retry
+    """
+    kwargs = dict(total=retries, backoff_factor=0.3)
+    if 'raise_on_status' in inspect.getargspec(Retry.__init__).args:
+        kwargs.update(status_forcelist=(502, 503, 504), raise_on_status=False)
+    return Retry(**kwargs)
+
+
+def http_session(retries=3, pool_maxsize=10):
+    """
+    Per-process requests.Session, keeping connections alive between calls
+
+    Connection failures, and where supported 502/503/504 responses to
+    idempotent requests, are retried with a backoff. Sessions are rebuilt after a fork, so
+    workers never share the parent's sockets
+
+    :param retries: number of retries for failed requests
+    :param pool_maxsize: connections kept open per host
+    :return: requests.Session
+    """
+    global _sessions, _sessions_pid
+
+    key = (retries, pool_maxsize)
+    with _sessions_lock:
+        if _sessions_pid != os.getpid():
+            _sessions = {}
+            _sessions_pid = os.getpid()
+
+        if key not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_maxsize,
+                                  pool_maxsize=pool_maxsize,
+                                  max_retries=_retry(retries))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[key] = session
+
+        return _sessions[key]
+
+
+def thread_pool(workers):
+    """
+    Long-lived, per-process pool for concurrent calls to external services,
+    whose threads keep their per-thread clients between runs. Pools are
+    rebuilt after a fork, like the sessions above
+
+    Tasks run on a pool must not wait on other tasks of the same pool
+
+    :param workers: number of threads
+    :return: multiprocessing.pool.ThreadPool
+    """
+    global _pools, _pools_pid
+
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools = {}
+            _pools_pid = os.getpid()
+        if workers not in _pools:
+            _pools[workers] = ThreadPool(workers)
+        return _pools[workers]
 
 
 def is_reachable(url, timeout=0.001, allow_redirects=True, n_tries=3):
@@ -13,8 +101,8 @@ def is_reachable(url, timeout=0.001, allow_redirects=True, n_tries=3):
     """
     for _ in range(n_tries):
         try:
-            resp = requests.head(url, timeout=timeout,
-                                 allow_redirects=allow_redirects)
+            resp = http_session(retries=0).head(url, timeout=timeout,
+                                                allow_redirects=allow_redirects)
             if resp.status_code == 200:
                 return True
         except Exception as e:
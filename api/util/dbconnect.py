@@ -2,36 +2,132 @@
 # TODO built in functionality
 import psycopg2
 import psycopg2.extras as db_extras
+import psycopg2.extensions as db_extns
+import psycopg2.pool as db_pool
 import numbers
 import os
+import threading
 
 from collections import OrderedDict
 from api.util import api_cfg
 
-def dictfetchall(cursor, fetcharr):
+def dictfetchall(cursor, fetcharr, description=None):
     ''' Returns all rows from a cursor as a dict '''
-    desc = cursor.description
-    return [OrderedDict(zip([col[0] for col in desc], row))
+    desc = description or cursor.description
+    cols = [col[0] for col in desc]
+    return [OrderedDict(zip(cols, row))
             for row in fetcharr]
 
+# cursor factories for the row types select can return
+ROW_TYPES = {'dict': db_extras.DictCursor,
+             'tuple': db_extns.cursor,
+             'namedtuple': db_extras.NamedTupleCursor}
+
 class DBConnectException(Exception):
     pass
 
+
+class ConnectionPool(object):
+    """
+    Per-process pool of psycopg2 connections
+
+    Pools are keyed on the process id, so that uwsgi workers forked from a
+    master which already touched the database build their own connections
+    instead of sharing the master's sockets
+    """
+    _pools = {}
+    _inherited = []
+    _pid = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls, dbhost, db, dbuser, dbpass, dbport, minconn=1, maxconn=10):
+        """
+        Retrieve the pool for the given connection parameters, creating
+        it if it does not yet exist in this process
+
+        :return: psycopg2.pool.ThreadedConnectionPool
+        """
+        key = (dbhost, db, dbuser, dbport)
+
+        with cls._lock:
+            pid = os.getpid()
+            if cls._pid != pid:
+                # Keep references to anything inherited across a fork, so
+                # garbage collection never closes the parent's connections
+                cls._inherited.extend(cls._pools.values())
+                cls._pools = {}
+                cls._pid = pid
+
+            if key not in cls._pools:
+                cls._pools[key] = db_pool.ThreadedConnectionPool(
+                    int(minconn), int(maxconn), host=dbhost, database=db,
+                    user=dbuser, password=dbpass, port=dbport)
+
+            return cls._pools[key]
+
+    @classmethod
+    def closeall(cls):
+        """
+        Close all connections held by this process's pools
+        """
+        with cls._lock:
+            if cls._pid == os.getpid():
+                for pool in cls._pools.values():
+                    pool.closeall()
+            cls._pools = {}
+
+    @staticmethod
+    def healthy(conn):
+        """
+        Verify a connection is still usable before handing it out
+
+        :param conn: psycopg2 connection
+        :return: bool
+        """
+        if conn.closed:
+            return False
+
+        if conn.get_transaction_status() == db_extns.TRANSACTION_STATUS_UNKNOWN:
+            return False
+
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+
+        return True
+
+
 class DBConnect(object):
     """
     Class for connecting to a postgresql database using a single with statement
+
+    Connections are borrowed from a per-process ConnectionPool and handed
+    back once the with block exits
     """
     def __init__(self, dbhost, db, dbuser, dbpass, dbport, autocommit=False,
-                 cursor_factory=db_extras.DictCursor):
+                 cursor_factory=db_extras.DictCursor, minconn=1, maxconn=10):
+        self.conn = None
+        self.cursor = None
+        self._search_path_set = False
+
         try:
-            self.conn = psycopg2.connect(host=dbhost, database=db, user=dbuser,
-                                         password=dbpass, port=dbport)
+            self.pool = ConnectionPool.get(dbhost, db, dbuser, dbpass, dbport,
+                                           minconn=minconn, maxconn=maxconn)
+            self.conn = self._checkout()
             self.cursor = self.conn.cursor(cursor_factory=cursor_factory)
-        except psycopg2.Error as e:
+        except (psycopg2.Error, db_pool.PoolError) as e:
+            self.release()
             raise DBConnectException(e)
 
         self.autocommit = autocommit
         self.fetcharr = []
+        self.description = None
+        self._dictfetchall = None
 
         # psycopg2 doesn't allow you to specify a schema when connecting to the database.
         # by modifying search_path for the connection, we can ensure were only working with
@@ -39,6 +135,48 @@ class DBConnect(object):
         if 'espa_api_testing' in os.environ.keys():
             if os.environ["espa_api_testing"] is "True":
                 self.cursor.execute("set search_path = espa_unit_test;")
+                self._search_path_set = True
+
+    def _checkout(self):
+        """
+        Borrow a connection from the pool, discarding any which
+        fail the health check
+
+        :return: psycopg2 connection
+        """
+        for _ in range(self.pool.maxconn + 1):
+            conn = self.pool.getconn()
+            if ConnectionPool.healthy(conn):
+                return conn
+            self.pool.putconn(conn, close=True)
+
+        raise DBConnectException('Unable to retrieve a healthy connection')
+
+    def release(self):
+        """
+        Return the connection to the pool, safe to call more than once
+        """
+        conn, self.conn = self.conn, None
+        cursor, self.cursor = self.cursor, None
+
+        if conn is None:
+            return
+
+        try:
+            if cursor is not None and not cursor.closed:
+                cursor.close()
+
+            if self._search_path_set and not conn.closed:
+                conn.rollback()
+                reset = conn.cursor()
+                reset.execute('reset search_path;')
+                reset.close()
+                conn.commit()
+        except psycopg2.Error:
+            self.pool.putconn(conn, close=True)
+            return
+
+        self.pool.putconn(conn, close=conn.closed != 0)
 
     def execute(self, sql_str, params=None):
         """
@@ -55,28 +193,56 @@ class DBConnect(object):
                 # this is for instances when execute is called, and
                 # a information is returned from the db
                 self.fetcharr = self.cursor.fetchall()
+                self.description = self.cursor.description
+                self._dictfetchall = None
         except psycopg2.Error or psycopg2.Warning as e:
             raise DBConnectException(e)
 
         if self.autocommit:
             self.commit()
 
-    def select(self, sql_str, params=None):
+    def select(self, sql_str, params=None, row_type=None):
         """
         Used for retrieving information from the database
         Results are stored in self.fetcharr to enable more flexible use
-        Each row result is stored as a tuple in the list array
+
+        :param row_type: 'dict', 'tuple' or 'namedtuple', defaults to the
+         rows produced by the connection's cursor_factory
         """
         if params and not self.verify_type(params):
             params = self.conv_totuple(params)
 
+        if row_type is not None and row_type not in ROW_TYPES:
+            raise DBConnectException('Unknown row type {}'.format(row_type))
+
         try:
-            self.cursor.execute(sql_str, params)
-            self.fetcharr = self.cursor.fetchall()
-            self.dictfetchall = dictfetchall(self.cursor, self.fetcharr)
+            if row_type is None:
+                cursor = self.cursor
+            else:
+                cursor = self.conn.cursor(cursor_factory=ROW_TYPES[row_type])
+            try:
+                cursor.execute(sql_str, params)
+                self.fetcharr = cursor.fetchall()
+                self.description = cursor.description
+            finally:
+                if cursor is not self.cursor:
+                    cursor.close()
+            self._dictfetchall = None
         except psycopg2.Error as e:
             raise DBConnectException(e)
 
+    @property
+    def dictfetchall(self):
+        """
+        The last selected rows as OrderedDicts, built on first access
+        """
+        if self._dictfetchall is None:
+            if self.description is None:
+                return []
+            self._dictfetchall = dictfetchall(None, self.fetcharr,
+                                              self.description)
+        return self._dictfetchall
+
     def commit(self):
         try:
             self.conn.commit()
@@ -117,9 +283,8 @@ class DBConnect(object):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
-            self.cursor.close()
-            self.conn.close()
-        except psycopg2.Error as e:
+            self.release()
+        except (psycopg2.Error, db_pool.PoolError) as e:
             raise DBConnectException(e)
 
     def __len__(self):
@@ -136,11 +301,7 @@ class DBConnect(object):
 
     def __del__(self):
         try:
-            self.cursor.close()
-            self.conn.close()
-
-            del self.cursor
-            del self.conn
+            self.release()
         except Exception as e:
             raise DBConnectException(e)
 
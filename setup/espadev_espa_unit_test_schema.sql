@@ -399,6 +399,53 @@ CREATE TABLE ordering_scene (
 
 ALTER TABLE espa_unit_test.ordering_scene OWNER TO espadev;
 
+--
+-- Name: ordering_ee_status_update_id_seq; Type: SEQUENCE; Schema: espa_unit_test; Owner: espadev
+--
+
+CREATE SEQUENCE ordering_ee_status_update_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE espa_unit_test.ordering_ee_status_update_id_seq OWNER TO espadev;
+
+--
+-- Name: ordering_ee_status_update; Type: TABLE; Schema: espa_unit_test; Owner: espadev; Tablespace: 
+--
+
+CREATE TABLE ordering_ee_status_update (
+    id integer DEFAULT nextval('ordering_ee_status_update_id_seq'::regclass) NOT NULL,
+    scene_id integer NOT NULL,
+    ee_order_id character varying(13) NOT NULL,
+    ee_unit_id integer NOT NULL,
+    status character varying(8) NOT NULL,
+    created timestamp without time zone DEFAULT now() NOT NULL,
+    attempts integer DEFAULT 0 NOT NULL,
+    next_attempt timestamp without time zone DEFAULT now() NOT NULL,
+    delivered timestamp without time zone,
+    last_error text
+);
+
+
+ALTER TABLE espa_unit_test.ordering_ee_status_update OWNER TO espadev;
+
+--
+-- Name: ordering_m2m_entity; Type: TABLE; Schema: espa_unit_test; Owner: espadev; Tablespace: 
+--
+
+CREATE TABLE ordering_m2m_entity (
+    display_id character varying(255) NOT NULL,
+    entity_id character varying(64),
+    updated timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE espa_unit_test.ordering_m2m_entity OWNER TO espadev;
+
 --
 -- Name: ordering_tag_id_seq; Type: SEQUENCE; Schema: espa_unit_test; Owner: espadev
 --
@@ -557,6 +604,22 @@ ALTER TABLE ONLY ordering_scene
     ADD CONSTRAINT ordering_scene_id_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: ordering_ee_status_update_id_pkey; Type: CONSTRAINT; Schema: espa_unit_test; Owner: espadev; Tablespace: 
+--
+
+ALTER TABLE ONLY ordering_ee_status_update
+    ADD CONSTRAINT ordering_ee_status_update_id_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: ordering_m2m_entity_display_id_pkey; Type: CONSTRAINT; Schema: espa_unit_test; Owner: espadev; Tablespace: 
+--
+
+ALTER TABLE ONLY ordering_m2m_entity
+    ADD CONSTRAINT ordering_m2m_entity_display_id_pkey PRIMARY KEY (display_id);
+
+
 --
 -- Name: ordering_userprofile_id_pkey; Type: CONSTRAINT; Schema: espa_unit_test; Owner: espadev; Tablespace: 
 --
@@ -790,6 +853,20 @@ CREATE INDEX ordering_scene_sensor_type ON ordering_scene USING btree (sensor_ty
 CREATE INDEX ordering_scene_status ON ordering_scene USING btree (status);
 
 
+--
+-- Name: ordering_ee_status_update_pending; Type: INDEX; Schema: espa_unit_test; Owner: espadev; Tablespace: 
+--
+
+CREATE INDEX ordering_ee_status_update_pending ON ordering_ee_status_update USING btree (next_attempt) WHERE (delivered IS NULL);
+
+
+--
+-- Name: ordering_ee_status_update_pending_unit; Type: INDEX; Schema: espa_unit_test; Owner: espadev; Tablespace: 
+--
+
+CREATE UNIQUE INDEX ordering_ee_status_update_pending_unit ON ordering_ee_status_update USING btree (ee_order_id, ee_unit_id) WHERE (delivered IS NULL);
+
+
 --
 -- Name: ordering_userprofile_user_id; Type: INDEX; Schema: espa_unit_test; Owner: espadev; Tablespace: 
 --
@@ -911,6 +988,14 @@ ALTER TABLE ONLY ordering_scene
     ADD CONSTRAINT ordering_scene_order_id_fkey FOREIGN KEY (order_id) REFERENCES ordering_order(id);
 
 
+--
+-- Name: ordering_ee_status_update_scene_id_fkey; Type: FK CONSTRAINT; Schema: espa_unit_test; Owner: espadev
+--
+
+ALTER TABLE ONLY ordering_ee_status_update
+    ADD CONSTRAINT ordering_ee_status_update_scene_id_fkey FOREIGN KEY (scene_id) REFERENCES ordering_scene(id) ON DELETE CASCADE;
+
+
 --
 -- Name: espa_unit_test; Type: ACL; Schema: -; Owner: postgres
 --
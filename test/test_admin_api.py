@@ -1,7 +1,14 @@
 import unittest
 import os
 
+from mock import patch
+
+from api.domain.mocks.order import MockOrder
+from api.domain.mocks.user import MockUser
+from api.domain.order import Order
+from api.domain.scene import Scene
 from api.interfaces.admin import version1
+from api.providers.configuration.configuration_provider import ConfigurationProvider
 
 espa = version1.API()
 
@@ -67,3 +74,44 @@ class TestAdminConfiguration(unittest.TestCase):
 
         resp = espa.access_configuration(key=self.test_key, delete=True)
         self.assertIsNone(resp)
+
+    def test_admin_config_snapshot(self):
+        config = ConfigurationProvider()
+        config.put(self.test_key, self.test_value)
+
+        with patch.object(ConfigurationProvider, '_retrieve_config') as retrieve:
+            self.assertEqual(config.get(self.test_key), self.test_value)
+            self.assertFalse(retrieve.called)
+
+        config.put(self.test_key, 'changed')
+        self.assertEqual(config.get(self.test_key), 'changed')
+        config.delete(self.test_key)
+
+
+class TestAdminOrders(unittest.TestCase):
+    def setUp(self):
+        os.environ['espa_api_testing'] = 'True'
+        self.mock_user = MockUser()
+        self.mock_order = MockOrder()
+        user_id = self.mock_user.add_testing_user()
+        self.order = Order.find(self.mock_order.generate_testing_order(user_id))
+
+    def tearDown(self):
+        self.mock_order.tear_down_testing_orders()
+        self.mock_user.cleanup()
+        os.environ['espa_api_testing'] = ''
+
+    def test_admin_error_to(self):
+        scenes = self.order.scenes()
+        errored, other = scenes[0], scenes[1]
+        errored.update('status', 'error')
+        other.update('status', 'complete')
+        self.order.update('status', 'complete')
+
+        self.assertTrue(espa.error_to(self.order.orderid, 'submitted'))
+
+        self.assertEqual(Scene.find(errored.id).status, 'submitted')
+        self.assertEqual(Scene.find(other.id).status, 'complete')
+        order = Order.find(self.order.id)
+        self.assertEqual(order.status, 'ordered')
+        self.assertIsNone(order.completion_email_sent)
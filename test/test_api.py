@@ -2,25 +2,31 @@
 import unittest
 import yaml
 import copy
+import pickle
+import time
+import threading
 
 from api.interfaces.ordering.version1 import API as APIv1
-from api.util import lowercase_all
+from api.util import lowercase_all, IPList, get_cfg, reload_cfg
 from api.util.dbconnect import db_instance
 import version0_testorders as testorders
 from api.providers.validation.validictory import BaseValidationSchema
-from api import ValidationException, InventoryException, __location__
+from api import ValidationException, InventoryException, ProductNotImplemented, __location__
+from api.domain import sensor
 
 import os
 from api.domain.mocks.order import MockOrder
 from api.domain.mocks.user import MockUser
 from api.domain.order import Order
 from api.domain.user import User
+from api.providers.caching.caching_provider import CachingProvider, LocalCache
 from api.providers.configuration.configuration_provider import ConfigurationProvider
 from api.providers.production.mocks.production_provider import MockProductionProvider
 from api.providers.production.production_provider import ProductionProvider
 from api.external.mocks import lta as mocklta
 from api.external.mocks import inventory as mockinventory
 from api.system.logger import ilogger as logger
+from api.system import errors
 from mock import patch
 
 api = APIv1()
@@ -98,6 +104,41 @@ class TestAPI(unittest.TestCase):
         self.assertTrue(len(orders) > 1)
         self.assertIn(self.order.orderid, [o.orderid for o in orders])
 
+    def test_user_hydration_does_not_upsert(self):
+        with patch.object(User, 'find_or_create_user') as upsert:
+            user = User.find(self.user.id)
+            User.where({'id': self.user.id})
+            User.query({'id': self.user.id}).all()
+        self.assertFalse(upsert.called)
+        self.assertEqual(user.id, self.user.id)
+
+    def test_user_from_login_throttles_upsert(self):
+        user_entry = (self.user.username, self.user.email, self.user.first_name,
+                      self.user.last_name, self.user.contactid)
+        user, seen = User.from_login(user_entry)
+        self.assertEqual(user.id, self.user.id)
+
+        with patch.object(User, 'find_or_create_user') as upsert:
+            again, again_seen = User.from_login(user_entry, seen)
+        self.assertFalse(upsert.called)
+        self.assertEqual(again.id, self.user.id)
+        self.assertEqual(again_seen, seen)
+
+    def test_user_pickle_round_trip(self):
+        user = User.find(self.staff_user.id)
+        # python-memcached pickles with protocol 0
+        loaded = pickle.loads(pickle.dumps(user, 0))
+        self.assertEqual(loaded.as_dict(), user.as_dict())
+        self.assertEqual(loaded.id, user.id)
+
+    def test_user_roles_loaded_with_row(self):
+        user = User.find(self.staff_user.id)
+        with patch('api.domain.user.db_instance') as db:
+            self.assertTrue(user.is_staff())
+            self.assertIn('staff', user.role_list())
+            self.assertIn('staff', user.as_dict()['roles'])
+        self.assertFalse(db.called)
+
     def test_fetch_order_by_orderid_val(self):
         order = api.fetch_order(self.order.orderid)
         self.assertEqual(1, len(order))
@@ -333,7 +374,7 @@ class TestInventory(unittest.TestCase):
         """
         self.assertIsNone(api.inventory.check(self.lta_order_good))
 
-    @patch('api.external.inventory.requests.post', mockinventory.CachedRequestPreventionSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.CachedRequestPreventionSpoof)
     @patch('api.external.inventory.available', lambda: True)
     @patch('api.external.inventory.get_cached_session', mockinventory.get_cached_session)
     @patch('api.external.inventory.LTACachedService.get_lookup', mockinventory.get_cache_values)
@@ -371,3 +412,192 @@ class TestInventory(unittest.TestCase):
         with self.assertRaises(InventoryException):
             api.inventory.check(self.lpdaac_order_bad)
 
+
+
+class TestDBConnect(unittest.TestCase):
+    def setUp(self):
+        os.environ['espa_api_testing'] = 'True'
+
+    def tearDown(self):
+        os.environ['espa_api_testing'] = ''
+
+    def test_connection_returned_to_pool(self):
+        with db_instance() as db:
+            conn = db.conn
+            db.select('select 1')
+        self.assertIsNone(db.conn)
+        self.assertEqual(len(db), 1)
+
+        with db_instance() as db:
+            self.assertIs(db.conn, conn)
+
+    def test_closed_connection_discarded(self):
+        with db_instance() as db:
+            conn = db.conn
+        conn.close()
+
+        with db_instance() as db:
+            self.assertIsNot(db.conn, conn)
+            db.select('select 1')
+        self.assertEqual(len(db), 1)
+
+    def test_select_row_types(self):
+        sql = 'select 1 as one, 2 as two'
+        with db_instance() as db:
+            db.select(sql, row_type='tuple')
+            self.assertEqual(db[0], (1, 2))
+            db.select(sql, row_type='namedtuple')
+            self.assertEqual(db[0].two, 2)
+            db.select(sql)
+            self.assertEqual(db[0]['one'], 1)
+        self.assertEqual(db.dictfetchall, [{'one': 1, 'two': 2}])
+
+
+class TestConfigFile(unittest.TestCase):
+    def test_cfg_parsed_once(self):
+        reload_cfg()
+        self.assertIs(get_cfg(), get_cfg())
+
+    def test_ip_list_networks(self):
+        ips = IPList('127.0.0.1, 10.0.0.0/8')
+        self.assertIn('127.0.0.1', ips)
+        self.assertIn('10.20.30.40', ips)
+        self.assertNotIn('127.0.0.10', ips)
+        self.assertNotIn('untrackable', ips)
+        self.assertFalse(IPList(''))
+
+
+class TestCaching(unittest.TestCase):
+    def test_local_cache_bounds(self):
+        local = LocalCache(maxsize=2, ttl=0)
+        local.put('a', 1, 60)
+        self.assertEqual(local.get('a'), (False, None))
+        self.assertEqual(local.get('a', stale=True), (True, 1))
+
+        local.put('b', 2, 60)
+        local.put('c', 3, 60)
+        self.assertEqual(local.get('a', stale=True), (False, None))
+        self.assertEqual(local.stats()['size'], 2)
+
+        local.put('d', 4, -1)
+        self.assertEqual(local.get('d', stale=True), (False, None))
+
+    def test_local_cache_refresh_keeps_expiry(self):
+        local = LocalCache(maxsize=10, ttl=0)
+        local.put('a', 1, 60)
+        local.refresh('a', 2)
+        self.assertEqual(local.get('a', stale=True), (True, 2))
+
+        # never set here, its real expiry is unknown
+        local.refresh('b', 3)
+        self.assertEqual(local.get('b', stale=True), (False, None))
+
+        local.put('c', 4, -1)
+        local.refresh('c', 5)
+        self.assertEqual(local.get('c', stale=True), (False, None))
+
+    def test_local_tier_skips_bookkeeping(self):
+        cache = CachingProvider(memcache_hosts=['127.0.0.1:1'], local=True)
+        cache.set_multi({'test_bookkeeping': 1, 'test_bookkeeping.meta': (0, 0)})
+        self.assertEqual(cache.get_multi(['test_bookkeeping', 'test_bookkeeping.meta']),
+                         {'test_bookkeeping': 1})
+        self.assertIsNone(cache.get('test_bookkeeping.meta'))
+
+    def test_degraded_serves_local(self):
+        cache = CachingProvider(memcache_hosts=['127.0.0.1:1'], local=True)
+        self.assertFalse(cache.set('test_degraded_key', [1, 2]))
+        self.assertFalse(cache.available())
+        self.assertEqual(cache.get('test_degraded_key'), [1, 2])
+        self.assertEqual(cache.get_multi(['test_degraded_key']),
+                         {'test_degraded_key': [1, 2]})
+        self.assertIn('hits', cache.stats()['local'])
+
+        # opt-in, values may be modified by callers
+        nolocal = CachingProvider(memcache_hosts=['127.0.0.1:1'])
+        self.assertIsNone(nolocal.get('test_degraded_key'))
+        self.assertGreater(nolocal.stats()['memcache']['errors'], 0)
+
+    def test_get_or_compute_single_flight(self):
+        cache = CachingProvider(memcache_hosts=['127.0.0.1:1'], local=True)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'computed'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+                       cache.get_or_compute('test_single_flight', compute, 60)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results, ['computed'] * 5)
+        self.assertEqual(len(calls), 1)
+
+
+class TestErrors(unittest.TestCase):
+    def setUp(self):
+        os.environ['espa_api_testing'] = 'True'
+
+    def tearDown(self):
+        os.environ['espa_api_testing'] = ''
+
+    def test_resolve_earlier_condition_wins(self):
+        # network text comes first, but http_errors is listed first
+        message = 'Network is unreachable, then: Read timed out.'
+        resolution = errors.resolve(message, None)
+        self.assertEqual(resolution.status, 'retry')
+        self.assertEqual(resolution.reason, 'HTTP connection error')
+
+        # 'Connection timed out' is a key of both conditions
+        resolution = errors.resolve('socket error: Connection timed out', None)
+        self.assertEqual(resolution.reason, 'HTTP connection error')
+
+    def test_resolve_builds_matched_retry_only(self):
+        with patch('api.system.errors.Errors._Errors__add_retry',
+                   return_value={}) as add_retry:
+            resolution = errors.resolve('gzip: stdin: unexpected end of file', None)
+        add_retry.assert_called_once_with('gzip_errors')
+        self.assertEqual(resolution.extra, {})
+
+        with patch('api.system.errors.Errors._Errors__add_retry') as add_retry:
+            resolution = errors.resolve('solar zenith angle out of range', None)
+        self.assertFalse(add_retry.called)
+        self.assertEqual(resolution.status, 'unavailable')
+        self.assertIsNone(resolution.extra)
+
+    def test_resolve_unmatched(self):
+        self.assertIsNone(errors.resolve('an error nobody has seen before', None))
+        self.assertIsNone(errors.resolve('', None))
+
+    def test_resolve_extras_not_shared(self):
+        first = errors.resolve('Lock wait timeout exceeded', None)
+        first.extra['retry_limit'] = 'changed'
+        second = errors.resolve('Read timed out.', None)
+        third = errors.resolve('Read timed out.', None)
+        self.assertIsNot(first.extra, second.extra)
+        self.assertIsNot(second.extra, third.extra)
+        self.assertEqual(second.extra['retry_limit'], '10')
+        self.assertIn('retry_after', second.extra)
+
+
+class TestSensor(unittest.TestCase):
+    def test_instance_dispatch(self):
+        inst = sensor.instance('LC08_L1TP_042034_20011103_20160706_01_T1.tar.gz')
+        self.assertIsInstance(inst, sensor.Landsat8OLITIRS)
+        self.assertEqual(inst.shortname, 'olitirs8_collection')
+        self.assertEqual(inst.product_id, 'LC08_L1TP_042034_20011103_20160706_01_T1')
+
+        inst = sensor.instance('MOD09GA.A2000072.h02v09.005.2008237032813')
+        self.assertIsInstance(inst, sensor.ModisTerra09GA)
+
+        with self.assertRaises(ProductNotImplemented):
+            sensor.instance('LC09_L1TP_042034_20011103_20160706_01_T1')
+
+    def test_instance_cached(self):
+        product_id = 'LE07_L1TP_026027_20170912_20171008_01_T1'
+        self.assertIs(sensor.instance(product_id), sensor.instance(product_id))
@@ -33,9 +33,11 @@ class TestLTA(unittest.TestCase):
         base_order = build_base_order()
         self.scene_ids = [base_order[b].get('inputs', [None]).pop() for b in base_order if type(base_order[b]) == dict]
         self.scene_ids = [s for s in self.scene_ids if s and (s.startswith('L'))]  # Landsat only
+        lta.clear_clients()
 
     def tearDown(self):
         os.environ['espa_api_testing'] = ''
+        lta.clear_clients()
 
     #@patch('api.external.lta.OrderUpdateServiceClient.update_order', mocklta.return_update_order_resp)
     @patch('api.external.lta.SoapClient', mocklta.MockSudsClient)
@@ -49,6 +51,38 @@ class TestLTA(unittest.TestCase):
         self.assertIn('order_status', resp)
         self.assertEqual(resp['order_num'], str(self.lta_order_number))
 
+    def test_get_order_statuses_partial_failure(self):
+        def order_status(tid):
+            if tid == 'bad':
+                raise Exception('LTA unavailable')
+            return {'order_num': tid, 'units': []}
+
+        with patch('api.external.lta.get_order_status', order_status):
+            resp = lta.get_order_statuses(['one', 'bad', 'two'], workers=2)
+        self.assertEqual(set(resp), {'one', 'two'})
+        self.assertEqual(resp['two']['order_num'], 'two')
+
+    def test_update_order_statuses_errors(self):
+        responses = [lta.UpdateOrderResponse(True, None, None),
+                     lta.UpdateOrderResponse(False, 'Unit not found', 'Fail'),
+                     True]
+        with patch('api.external.lta.update_order_status', side_effect=responses):
+            resp = lta.update_order_statuses([('0001', 1, 'C'), ('0001', 2, 'C'),
+                                              ('0001', 3, 'R')])
+        self.assertIsNone(resp[('0001', 1)])
+        self.assertEqual(resp[('0001', 2)], 'Fail: Unit not found')
+        self.assertIn('success', resp[('0001', 3)])
+
+    @patch('api.external.lta.SoapClient', mocklta.MockSudsClient)
+    def test_soap_client_reused(self):
+        client = lta.OrderUpdateServiceClient.pooled()
+        lta.get_order_status(self.lta_order_number)
+        self.assertIs(lta.OrderUpdateServiceClient.pooled(), client)
+        self.assertIsNot(lta.RegistrationServiceClient.pooled(), client)
+
+        lta.OrderUpdateServiceClient.discard()
+        self.assertIsNot(lta.OrderUpdateServiceClient.pooled(), client)
+
     @patch('api.external.lta.SoapClient', mocklta.MockSudsClient)
     def test_update_order_complete(self):
         resp = lta.update_order_status(self.lta_order_number, self.lta_unit_number, 'C')
@@ -76,32 +110,104 @@ class TestInventory(unittest.TestCase):
     def tearDown(self):
         os.environ['espa_api_testing'] = ''
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_login(self):
         token = inventory.get_session()
         self.assertIsInstance(token, basestring)
         self.assertTrue(inventory.logout(token))
 
-    @patch('api.external.inventory.requests.head', mockinventory.RequestsSpoof)
+    def test_api_client_reused(self):
+        client = inventory.LTAService.client(self.token)
+        other = inventory.LTAService.client()
+        self.assertEqual(client.token, self.token)
+        self.assertIsNone(other.token)
+        self.assertEqual(client.base_url, other.base_url)
+        self.assertIs(inventory.http_session(), inventory.http_session())
+
+    def test_api_client_follows_config(self):
+        key = 'bulk.{}.json.version'.format(inventory.config.mode)
+        version = inventory.config.get(key)
+        try:
+            inventory.config.put(key, 'test-version')
+            self.assertEqual(inventory.LTAService.client().api_version, 'test-version')
+        finally:
+            inventory.config.put(key, version)
+        self.assertEqual(inventory.LTAService.client().api_version, version)
+
+    @patch('api.external.inventory.requests.Session.head', mockinventory.RequestsSpoof)
     def test_api_available(self):
         self.assertTrue(inventory.available())
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_id_lookup(self):
         entity_ids = inventory.convert(self.token, self.contact_id, self.collection_ids)
         self.assertEqual(set(self.collection_ids), set(entity_ids))
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.LOOKUP_CHUNK_SIZE', 1)
+    @patch('api.external.inventory.LTACachedService.set_lookup')
+    @patch('api.external.inventory.LTACachedService.get_lookup', return_value={})
+    @patch('api.external.inventory.requests.Session.post')
+    def test_api_chunked_requests(self, mock_post, *_):
+        mock_post.side_effect = mockinventory.RequestsSpoof
+        client = inventory.LTAService.client(self.token)
+        entity_ids = client.id_lookup(self.collection_ids, 'LANDSAT_8_C1', chunk_size=2)
+        self.assertEqual(set(self.collection_ids), set(entity_ids))
+        self.assertEqual(2, mock_post.call_count)
+
+        mock_post.reset_mock()
+        urls = inventory.download_urls(self.token, self.collection_ids)
+        self.assertEqual(set(self.collection_ids), set(urls))
+        # one idLookup and one download per scene, across three datasets
+        self.assertEqual(6, mock_post.call_count)
+
+    @patch('api.external.inventory.LTACachedService.set_lookup')
+    @patch('api.external.inventory.LTACachedService.get_lookup')
+    @patch('api.external.inventory.requests.Session.post')
+    def test_api_id_lookup_cached(self, mock_post, mock_get, mock_set):
+        known, missing, miss = self.collection_ids
+        mock_get.return_value = {known: 'LC81560632017038LGN00', missing: None}
+        mock_post.side_effect = mockinventory.RequestsSpoof
+        results = inventory.check_valid(self.token, self.collection_ids)
+        self.assertEqual({known: True, missing: False, miss: True}, results)
+        # only the uncached ID was sent to M2M, and then cached
+        self.assertEqual(1, mock_post.call_count)
+        self.assertIn(miss, mock_post.call_args[1]['data']['jsonRequest'])
+        self.assertNotIn(known, mock_post.call_args[1]['data']['jsonRequest'])
+        mock_set.assert_called_once_with({miss: 'LT50320282012116EDC00'})
+
+    def test_entity_cache_round_trip(self):
+        client = inventory.LTACachedService.client(self.token)
+        known, missing = 'LC08_TEST_ENTITY_CACHE_FOUND', 'LC08_TEST_ENTITY_CACHE_MISSING'
+        with patch.object(client.entity_cache, 'set_multi', return_value=True) as set_multi:
+            client.set_lookup({known: 'LC81560632017038LGN00', missing: None})
+        found, gone = [c[0] for c in set_multi.call_args_list]
+        self.assertEqual(found, ({client._entity_key(known): 'LC81560632017038LGN00'},
+                                 inventory.ENTITY_TTL))
+        self.assertEqual(gone, ({client._entity_key(missing): ''}, inventory.MISSING_TTL))
+
+        # the table answers, and refills memcache, when memcache has nothing
+        with patch.object(client.entity_cache, 'get_multi', return_value={}), \
+                patch.object(client.entity_cache, 'set_multi', return_value=True) as set_multi:
+            results = client.get_lookup([known, missing, 'LC08_TEST_ENTITY_CACHE_NEVER_SEEN'])
+        self.assertEqual(results, {known: 'LC81560632017038LGN00', missing: None})
+        self.assertEqual(set_multi.call_count, 2)
+
+        # known missing IDs are stored empty in memcache
+        with patch.object(client.entity_cache, 'get_multi',
+                          return_value={client._entity_key(missing): ''}):
+            self.assertEqual(client.get_lookup([missing]), {missing: None})
+
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_validation(self):
         expected = {k: True for k in self.collection_ids}
         results = inventory.verify_scenes(self.token, self.contact_id, self.collection_ids)
         self.assertItemsEqual(expected, results)
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_api_get_download_urls(self):
         entity_ids = inventory.convert(self.token, self.contact_id, self.collection_ids)
         results = inventory.get_download_urls(self.token, self.contact_id, self.collection_ids, self.usage)
@@ -113,14 +219,14 @@ class TestInventory(unittest.TestCase):
         for pid in entity_ids.values():
             self.assertRegexpMatches(results.get(pid), ip_address_host_regex)
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_set_user_context(self):
         success = inventory.set_user_context(self.token, self.contact_id)
         self.assertTrue(success)
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_clear_user_context(self):
         success = inventory.clear_user_context(self.token)
         self.assertTrue(success)
@@ -129,20 +235,20 @@ class TestInventory(unittest.TestCase):
         with self.assertRaisesRegexp(ProductNotImplemented, 'is not a supported sensor product'):
             _ = inventory.convert(self.token, self.contact_id, ['bad_id_yo'])
 
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def test_bad_id_lookup(self):
         with self.assertRaisesRegexp(inventory.LTAError, 'ID Lookup failed'):
             _ = inventory.convert(self.token, self.contact_id, ['LC08_L1TP_000000_19000101_00000000_00_T1'])
 
-    @patch('api.external.inventory.requests.post', mockinventory.BadRequestSpoofError)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.BadRequestSpoofError)
     def test_error_code_halt(self):
         expected = 'UNKNOWN: A fake server error occurred'
         with self.assertRaisesRegexp(inventory.LTAError, expected):
             _ = inventory.get_session()
 
-    @patch('api.external.inventory.requests.get', mockinventory.BadRequestSpoofNegative)
-    @patch('api.external.inventory.requests.post', mockinventory.BadRequestSpoofNegative)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.BadRequestSpoofNegative)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.BadRequestSpoofNegative)
     def test_false_data_response(self):
         expected = 'Set user context ESPA failed for user {}'.format(self.contact_id)
         with self.assertRaisesRegexp(inventory.LTAError, expected):
@@ -154,8 +260,8 @@ class TestCachedInventory(unittest.TestCase):
     Provide testing for the CACHED EarthExplorer JSON API
         (FIXME: this still requires an active memcached session)
     """
-    @patch('api.external.inventory.requests.get', mockinventory.RequestsSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.RequestsSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.RequestsSpoof)
     def setUp(self):
         os.environ['espa_api_testing'] = 'True'
         self.token = inventory.get_cached_session()  # Initial "real" request
@@ -168,19 +274,19 @@ class TestCachedInventory(unittest.TestCase):
     def tearDown(self):
         os.environ['espa_api_testing'] = ''
 
-    @patch('api.external.inventory.requests.post', mockinventory.CachedRequestPreventionSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.CachedRequestPreventionSpoof)
     def test_cached_login(self):
         token = inventory.get_cached_session()
         self.assertIsInstance(token, basestring)
 
-    @patch('api.external.inventory.requests.get', mockinventory.CachedRequestPreventionSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.CachedRequestPreventionSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.CachedRequestPreventionSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.CachedRequestPreventionSpoof)
     def test_cached_lookup(self):
         entity_ids = inventory.get_cached_convert(self.token, self.collection_ids)
         self.assertEqual(set(self.collection_ids), set(entity_ids))
 
-    @patch('api.external.inventory.requests.get', mockinventory.CachedRequestPreventionSpoof)
-    @patch('api.external.inventory.requests.post', mockinventory.CachedRequestPreventionSpoof)
+    @patch('api.external.inventory.requests.Session.get', mockinventory.CachedRequestPreventionSpoof)
+    @patch('api.external.inventory.requests.Session.post', mockinventory.CachedRequestPreventionSpoof)
     def test_cached_verify_scenes(self):
         expected = {k: True for k in self.collection_ids}
         results = inventory.get_cached_verify_scenes(self.token, self.collection_ids)
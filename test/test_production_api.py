@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 import datetime
+import pickle
 import unittest
 
 import os
 from api.domain.mocks.order import MockOrder
 from api.domain.mocks.user import MockUser
+from api.domain.ee_status import EEStatusUpdate
+from api.domain.m2m_entity import M2MEntity
 from api.domain.order import Order, OptionsConversion
-from api.domain.scene import Scene
+from api.domain.scene import Scene, DEFERRED
 from api.domain.user import User
 from api.external.mocks import lta, inventory, lpdaac, onlinecache, hadoop
 from api.interfaces.production.version1 import API
@@ -300,6 +303,8 @@ class TestProductionAPI(unittest.TestCase):
         order = Order.find(self.mock_order.generate_testing_order(self.user_id))
         scene = order.scenes()[1]
         order.update('order_source', 'ee')
+        order.update('ee_order_id', '0101703090001')
+        scene.update('ee_unit_id', 1)
         production_provider.update_product('mark_product_complete',
                                            name=scene.name,
                                            orderid=order.orderid,
@@ -309,13 +314,36 @@ class TestProductionAPI(unittest.TestCase):
                                            log_file_contents='some log')
 
         s = Scene.where({'name': scene.name, 'order_id': scene.order_id})[0]
-        self.assertTrue('C' == s.failed_lta_status_update)
+        self.assertIsNone(s.failed_lta_status_update)
+        queued = EEStatusUpdate.where({'scene_id': s.id})
+        self.assertEqual([u['status'] for u in queued], ['C'])
+
+        # LTA failing leaves the update queued for a later attempt
+        production_provider.deliver_ee_updates()
+        queued = EEStatusUpdate.where({'scene_id': s.id})[0]
+        self.assertIsNone(queued['delivered'])
+        self.assertEqual(queued['attempts'], 1)
+        self.assertIn('lta comms failed', queued['last_error'])
+
+    @patch('api.external.lta.update_order_status', lta.update_order_status)
+    def test_production_deliver_ee_updates(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        scenes = order.scenes()[0:2]
+        for idx, scene in enumerate(scenes):
+            scene.update('ee_unit_id', idx + 1)
+        updates = [(s, '0101703090002', 'R') for s in Scene.find([s.id for s in scenes])]
+        self.assertTrue(production_provider.queue_ee_updates(updates))
+
+        production_provider.deliver_ee_updates()
+        queued = EEStatusUpdate.where({'scene_id': [s.id for s in scenes]})
+        self.assertEqual(len(queued), 2)
+        self.assertTrue(all(u['delivered'] for u in queued))
 
     @patch('api.providers.production.production_provider.ProductionProvider.send_initial_emails',
            mock_production_provider.respond_true)
     @patch('api.providers.production.production_provider.ProductionProvider.handle_onorder_landsat_products',
            mock_production_provider.respond_true)
-    @patch('api.providers.production.production_provider.ProductionProvider.handle_retry_products',
+    @patch('api.providers.production.production_provider.ProductionProvider.handle_retry_products_where',
            mock_production_provider.respond_true)
     @patch('api.providers.production.production_provider.ProductionProvider.load_ee_orders',
            mock_production_provider.respond_true)
@@ -511,6 +539,105 @@ class TestProductionAPI(unittest.TestCase):
         upscenes = Scene.where({'status': 'complete', 'download_size': 999})
         self.assertEqual(len(upscenes), len(scenes))
 
+    def test_scene_bulk_update_rows(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        first, second = order.scenes()[:2]
+        now = datetime.datetime.now()
+        Scene.bulk_update_rows([(first.id, {'download_size': 123}),
+                                (second.id, {'status': 'error',
+                                             'completion_date': now,
+                                             'note': None})])
+        self.assertEqual(Scene.find(first.id).download_size, 123)
+        updated = Scene.find(second.id)
+        self.assertEqual(updated.status, 'error')
+        self.assertEqual(updated.completion_date, now)
+        self.assertIsNone(updated.note)
+
+    def test_scene_update_where(self):
+        order_id = self.mock_order.generate_testing_order(self.user_id)
+        scene_ids = set(s.id for s in Scene.where({'order_id': order_id}))
+        updated = Scene.update_where({'order_id': order_id}, {'status': 'retry'})
+        self.assertEqual(scene_ids, set(updated))
+        self.assertEqual({'retry'}, set(s.status for s in Scene.where({'order_id': order_id})))
+
+        updated = Scene.update_where({'order_id': order_id, 'status': 'queued'},
+                                     {'status': 'submitted'})
+        self.assertEqual(updated, [])
+
+        updated = Order.update_where({'id': order_id}, {'note': 'updated'},
+                                     returning='note')
+        self.assertEqual(updated, ['updated'])
+
+    def test_scene_query(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        scene_ids = sorted(s.id for s in order.scenes())
+        query = Scene.query({'order_id': order.id})
+
+        self.assertEqual(query.count(), len(scene_ids))
+        self.assertTrue(query.exists())
+        self.assertFalse(query.where({'status': 'purged'}).exists())
+        self.assertEqual([s.id for s in query.order_by('id').limit(2).all()], scene_ids[:2])
+        self.assertEqual(query.order_by('id DESC').first().id, scene_ids[-1])
+        self.assertEqual(query.order_by('id').offset(1).values_list('id'), scene_ids[1:])
+        self.assertEqual(set(query.values('id', 'name')[0]), {'id', 'name'})
+        self.assertEqual(order.scene_status_count(), len(scene_ids))
+
+        joined = Scene.query({'order_id': order.id}, prefetch=('user_id',))
+        self.assertEqual(joined.count(), len(scene_ids))
+        found = joined.order_by('id').limit(2).all()
+        self.assertEqual([s.id for s in found], scene_ids[:2])
+        self.assertEqual(found[0]._order_attrs, {'user_id': order.user_id})
+        self.assertEqual(joined.where({'id >': scene_ids[0]}).order_by('id').values_list('id'),
+                         scene_ids[1:])
+
+    def test_scene_deferred_columns(self):
+        order_id = self.mock_order.generate_testing_order(self.user_id)
+        scene = Scene.where({'order_id': order_id})[0]
+        Scene.bulk_update([scene.id], {'log_file_contents': 'big log', 'note': 'noted'})
+
+        lazy = Scene.find(scene.id)
+        with patch('api.domain.scene.db_instance') as scene_db:
+            self.assertNotIn('big log', repr(lazy))
+        self.assertFalse(scene_db.called)
+        self.assertIs(lazy._log_file_contents, DEFERRED)
+        self.assertEqual(lazy.changed_fields(), ())
+        self.assertEqual(lazy.as_dict()['note'], 'noted')
+        self.assertEqual(lazy.log_file_contents, 'big log')
+        self.assertEqual(lazy.note, 'noted')
+
+        eager = Scene.find(scene.id, eager=True)
+        self.assertEqual(eager._note, 'noted')
+
+        lazy = Scene.find(scene.id)
+        lazy.status = 'error'
+        lazy.save()
+        self.assertEqual(Scene.find(scene.id, eager=True).log_file_contents, 'big log')
+
+    def test_domain_construction_without_queries(self):
+        order_id = self.mock_order.generate_testing_order(self.user_id)
+        found = Scene.where({'order_id': order_id})[0]
+        order = Order.find(order_id)
+
+        with patch('api.domain.scene.db_instance') as scene_db, \
+                patch('api.domain.order.db_instance') as order_db:
+            scene = Scene(name=found.name, order_id=order_id)
+            new_order = Order(orderid=order.orderid)
+        self.assertFalse(scene_db.called)
+        self.assertFalse(order_db.called)
+        self.assertIsNone(scene.id)
+        self.assertIsNone(new_order.id)
+        self.assertFalse(hasattr(scene, '__dict__'))
+        self.assertFalse(hasattr(new_order, '__dict__'))
+
+        self.assertEqual(Scene.lookup_id(found.name, order_id), found.id)
+        self.assertEqual(Order.lookup_id(order.orderid), order.id)
+
+    def test_scene_iter_where(self):
+        order_id = self.mock_order.generate_testing_order(self.user_id)
+        scene_ids = sorted(s.id for s in Scene.where({'order_id': order_id}))
+        found = [s.id for s in Scene.iter_where({'order_id': order_id}, batch_size=2)]
+        self.assertEqual(found, scene_ids)
+
     @patch('api.providers.production.production_provider.ProductionProvider.update_order_if_complete',
            mock_production_provider.respond_true)
     def test_production_finalize_orders(self):
@@ -697,6 +824,92 @@ class TestProductionAPI(unittest.TestCase):
         scenes = Scene.where({'order_id': order_id})
         self.assertEqual({'submitted'}, set([s.status for s in scenes]))
 
+    def test_scene_get_contexts(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        scenes = order.scenes()
+        pairs = [(s.name, order.orderid) for s in scenes]
+        found = Scene.get_contexts(pairs)
+        self.assertEqual(set(pairs), set(found.keys()))
+
+        scene = Scene.get_context(scenes[0].name, order.orderid)
+        self.assertEqual(scene.id, scenes[0].id)
+        self.assertEqual(scene.order_attr('status'), order.status)
+        self.assertEqual(scene.order_attr('order_source'), order.order_source)
+
+    def test_scene_where_prefetch(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        scenes = Scene.where({'order_id': order.id},
+                             prefetch=('product_opts', 'ee_order_id'))
+        self.assertTrue(scenes)
+        self.assertEqual(scenes[0].order_attr('ee_order_id'), order.ee_order_id)
+        opts = set(id(s.order_attr('product_opts')) for s in scenes)
+        self.assertEqual(len(opts), 1)
+
+        found = Scene.find([s.id for s in scenes], prefetch=('status',))
+        self.assertEqual(found[0].order_attr('status'), order.status)
+
+        plain = Scene.prefetch_order_attrs(order.scenes(), ('user_id',))
+        self.assertEqual(plain[0].order_attr('user_id'), order.user_id)
+
+        # values not prefetched are read again, seeing later order changes
+        scene = order.scenes()[0]
+        self.assertEqual(scene.order_attr('priority'), order.priority)
+        order.update('priority', 'high')
+        self.assertEqual(scene.order_attr('priority'), 'high')
+
+    def test_scene_save_changed_only(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        scene = order.scenes()[0]
+        self.assertEqual(scene.changed_fields(), ())
+
+        scene.note = 'changed only'
+        self.assertEqual(scene.changed_fields(), ('note',))
+        scene.save(changed_only=True)
+        self.assertEqual(scene.changed_fields(), ())
+        self.assertEqual(Scene.find(scene.id).note, 'changed only')
+
+        order.note = 'returning'
+        order.save()
+        self.assertEqual(order.changed_fields(), ())
+        self.assertEqual(Order.find(order.id).note, 'returning')
+
+    def test_m2m_entity_lookup(self):
+        found, missing = 'LC08_TEST_M2M_ENTITY_FOUND', 'LC08_TEST_M2M_ENTITY_MISSING'
+        M2MEntity.save({found: 'LC8TESTENTITY', missing: None})
+        self.assertEqual(M2MEntity.lookup([found, missing, 'LC08_NEVER_SEEN'], 60, 60),
+                         {found: 'LC8TESTENTITY', missing: None})
+
+        # each kind expires on its own ttl
+        self.assertEqual(M2MEntity.lookup([found, missing], 60, 0), {found: 'LC8TESTENTITY'})
+        self.assertEqual(M2MEntity.lookup([found, missing], 0, 60), {missing: None})
+
+        M2MEntity.save({missing: 'LC8TESTFOUNDLATER'})
+        self.assertEqual(M2MEntity.lookup([missing], 60, 0), {missing: 'LC8TESTFOUNDLATER'})
+        self.assertEqual(M2MEntity.lookup([], 60, 60), {})
+
+    def test_order_product_opts_copied_on_access(self):
+        order_id = self.mock_order.generate_testing_order(self.user_id)
+        order = Order.find(order_id)
+        # nothing is copied until product_opts is read
+        self.assertIs(order._saved['product_opts'], order._product_opts)
+        self.assertEqual(order.changed_fields(), ())
+        self.assertIsNot(order._saved['product_opts'], order._product_opts)
+
+        order = Order.find(order_id)
+        order.product_opts['note_for_test'] = True
+        self.assertEqual(order.changed_fields(), ('product_opts',))
+
+    def test_domain_pickle_round_trip(self):
+        order = Order.find(self.mock_order.generate_testing_order(self.user_id))
+        scene = order.scenes()[0]
+        for obj in (order, scene):
+            loaded = pickle.loads(pickle.dumps(obj, 0))
+            self.assertEqual(loaded.id, obj.id)
+            self.assertEqual(loaded.changed_fields(), ())
+        loaded = pickle.loads(pickle.dumps(scene, 0))
+        self.assertEqual(loaded.as_dict(deferred=False), scene.as_dict(deferred=False))
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
 